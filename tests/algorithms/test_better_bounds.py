@@ -0,0 +1,62 @@
+import pytest
+
+from permuta import Perm
+from tilings import GriddedPerm, Tiling
+from tilings.algorithms import MinimalGriddedPerms
+from tilings.algorithms.better_bounds import (
+    BetterBounds,
+    better_bounds,
+    superpattern_bound,
+)
+
+
+@pytest.mark.parametrize(
+    ("patts", "bound"),
+    [
+        ([Perm((0, 1, 2))], 3),
+        ([Perm((0, 1)), Perm((1, 0))], 3),
+        ([Perm((0, 1)), Perm((0, 1, 2))], 3),
+        ([Perm((1, 0, 3, 2)), Perm((2, 3, 0, 1))], 6),
+        ([Perm((0, 1, 2, 3)), Perm((3, 2, 1, 0))], 8),
+        ([Perm((0, 1)), Perm((7, 6, 5, 4, 3, 2, 1, 0))], 9),
+        ([Perm((0, 2, 1)), Perm((1, 0, 2)), Perm((2, 1, 0))], 6),
+    ],
+)
+def test_superpattern_bound(patts, bound):
+    assert superpattern_bound(patts) == bound
+
+
+def test_precomputed_bounds():
+    for patts, value in better_bounds.items():
+        if len(patts) == 2 and sum(map(len, patts)) <= 7:
+            assert sum(map(len, patts)) - superpattern_bound(patts) == value
+
+
+def test_better_bounds_file(tmp_path):
+    path = str(tmp_path / "better_bounds.jsonl")
+    patts = frozenset([Perm((0, 1)), Perm((7, 6, 5, 4, 3, 2, 1, 0))])
+    bounds = BetterBounds(path)
+    assert patts not in bounds
+    assert bounds[patts] == 1
+    # the complement is looked up from the bound of patts
+    assert bounds[frozenset(p.complement() for p in patts)] == 1
+    assert BetterBounds()[frozenset([Perm((0, 1)), Perm((1, 0))])] == 1
+    assert BetterBounds(path)[patts] == 1
+    assert patts in BetterBounds(path)
+
+
+def test_minimal_gridded_perms_better_bounds_file(tmp_path):
+    path = tmp_path / "better_bounds.jsonl"
+    t = Tiling(
+        requirements=[
+            [GriddedPerm(Perm((0, 1)), ((0, 0), (0, 0)))],
+            [GriddedPerm(Perm((7, 6, 5, 4, 3, 2, 1, 0)), ((0, 0),) * 8)],
+        ]
+    )
+    MinimalGriddedPerms.set_better_bounds_file(str(path))
+    try:
+        mgps = list(MinimalGriddedPerms(t).minimal_gridded_perms())
+        assert mgps and all(len(gp) == 9 for gp in mgps)
+        assert path.read_text()
+    finally:
+        MinimalGriddedPerms.set_better_bounds_file(None)
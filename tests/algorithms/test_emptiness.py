@@ -0,0 +1,178 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from permuta import Perm
+from tilings import GriddedPerm, Tiling
+from tilings.algorithms import EmptinessCache, EmptinessChecker
+from tilings.algorithms.obstruction_inferral import ObstructionInferral
+
+
+def tiling(obstructions, requirements):
+    return Tiling(
+        obstructions,
+        requirements,
+        remove_empty_rows_and_cols=False,
+        derive_empty=False,
+        simplify=False,
+    )
+
+
+point_in_each = (
+    (GriddedPerm.point_perm((0, 0)),),
+    (GriddedPerm.point_perm((1, 0)),),
+)
+
+
+@pytest.mark.parametrize(
+    ("t", "layer", "empty"),
+    [
+        (tiling([GriddedPerm.empty_perm()], []), "obstruction", True),
+        (
+            tiling(
+                [GriddedPerm.point_perm((1, 0))],
+                [
+                    [
+                        GriddedPerm(Perm((0, 1)), ((0, 0), (1, 0))),
+                        GriddedPerm(Perm((1, 0)), ((1, 0), (1, 0))),
+                    ]
+                ],
+            ),
+            "requirement",
+            True,
+        ),
+        (
+            tiling([], [[GriddedPerm(Perm((0, 1)), ((0, 0), (1, 0)))]]),
+            "single",
+            False,
+        ),
+        (
+            tiling(
+                [
+                    GriddedPerm(Perm((0, 1)), ((0, 0), (1, 0))),
+                    GriddedPerm(Perm((1, 0)), ((0, 0), (1, 0))),
+                ],
+                point_in_each,
+            ),
+            "pair",
+            True,
+        ),
+        (
+            tiling(
+                [GriddedPerm(Perm((1, 0)), ((0, 0), (1, 0)))],
+                [
+                    [GriddedPerm(Perm((0, 1)), ((0, 0), (1, 0)))],
+                    [GriddedPerm.point_perm((0, 0))],
+                ],
+            ),
+            "initial",
+            False,
+        ),
+        (
+            tiling(
+                [
+                    GriddedPerm(Perm((0, 1, 2)), ((0, 0), (1, 0), (1, 0))),
+                    GriddedPerm(Perm((1, 0, 2)), ((0, 0), (1, 0), (1, 0))),
+                    GriddedPerm(Perm((2, 0, 1)), ((0, 0), (1, 0), (1, 0))),
+                ],
+                [
+                    [GriddedPerm(Perm((0, 1)), ((1, 0), (1, 0)))],
+                    [GriddedPerm(Perm((0, 1)), ((0, 0), (1, 0)))],
+                ],
+            ),
+            "search",
+            True,
+        ),
+    ],
+)
+def test_layers(t, layer, empty):
+    checker = EmptinessChecker(t)
+    assert checker.is_empty() == empty
+    assert checker.layer == layer
+    assert t.is_empty() == empty
+
+
+def test_stats():
+    EmptinessChecker.reset_stats()
+    assert set(EmptinessChecker.stats().values()) == {0}
+    t = tiling(
+        [],
+        [
+            [GriddedPerm(Perm((0, 1)), ((0, 0), (1, 0)))],
+            [GriddedPerm.point_perm((0, 0))],
+        ],
+    )
+    checker = EmptinessChecker(t)
+    checker.is_empty()
+    checker.is_empty()
+    assert not t.is_empty()
+    assert EmptinessChecker.stats()["initial"] == 2
+    assert sum(EmptinessChecker.stats().values()) == 2
+    EmptinessChecker.reset_stats()
+    assert EmptinessChecker.stats()["initial"] == 0
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    EmptinessChecker.enable_cache(str(tmp_path))
+    yield str(tmp_path)
+    EmptinessChecker.disable_cache()
+
+
+def test_cache(cache_dir):
+    t = tiling(
+        [GriddedPerm(Perm((1, 0)), ((0, 0), (1, 0)))],
+        [
+            [GriddedPerm(Perm((0, 1)), ((0, 0), (1, 0)))],
+            [GriddedPerm.point_perm((0, 0))],
+        ],
+    )
+    assert EmptinessChecker(t).layer == "initial"
+    assert EmptinessChecker(t).layer == "cache"
+    EmptinessChecker.disable_cache()
+    assert EmptinessChecker(t).layer == "initial"
+    EmptinessChecker.enable_cache(cache_dir)
+    assert EmptinessChecker(t).layer == "cache"
+    assert not EmptinessChecker(t).is_empty()
+    assert EmptinessChecker.cache().stats()["hits"] == 2
+
+
+def test_cache_maxsize(tmp_path):
+    cache = EmptinessCache(str(tmp_path), maxsize=2, batch_size=2)
+    cache[b"a"] = True
+    assert cache.get(b"a")
+    cache[b"b"] = False
+    cache[b"c"] = True
+    cache[b"d"] = False
+    assert len(cache) == 2
+    assert cache.get(b"a") is None
+    assert cache.get(b"b") is None
+    assert cache.get(b"d") is False
+    cache.close()
+    with pytest.raises(ValueError):
+        EmptinessCache(str(tmp_path), maxsize=0)
+
+
+def _write_keys(cache_dir, start):
+    cache = EmptinessCache(cache_dir, batch_size=7)
+    for i in range(start, start + 50):
+        cache[bytes([i])] = i % 2 == 0
+    cache.close()
+
+
+def test_cache_processes(tmp_path):
+    with ProcessPoolExecutor(2) as executor:
+        list(executor.map(_write_keys, [str(tmp_path)] * 4, range(0, 200, 50)))
+    cache = EmptinessCache(str(tmp_path))
+    assert len(cache) == 200
+    assert cache.get(bytes([42])) and not cache.get(bytes([43]))
+    cache.close()
+
+
+def test_cache_can_add_obstruction(cache_dir):
+    t = Tiling.from_string("123")
+    ob = GriddedPerm(Perm((0, 1, 2)), ((0, 0),) * 3)
+    assert ObstructionInferral.can_add_obstruction(ob, t)
+    hits = EmptinessChecker.cache().stats()["hits"]
+    assert ObstructionInferral.can_add_obstruction(ob, t)
+    assert EmptinessChecker.cache().stats()["hits"] == hits + 1
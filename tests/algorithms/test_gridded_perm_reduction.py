@@ -0,0 +1,22 @@
+from itertools import product
+
+from permuta import Perm
+from tilings import GriddedPerm, Tiling
+from tilings.algorithms import GriddedPermReduction
+
+
+def test_minimize():
+    cells = list(product(range(2), range(2)))
+    t = Tiling([GriddedPerm.single_cell(Perm((0, 1, 2, 3)), cell) for cell in cells])
+    gps = [gp for gp in t.gridded_perms(4) if len(gp) > 1]
+    # Few enough length 2 gridded perms for the length 3 layer to be checked
+    # with the index, and the length 4 layer with the subperm lookup.
+    gps = [gp for gp in gps if len(gp) == 2][:2] + [gp for gp in gps if len(gp) > 2]
+    minimal = GriddedPermReduction._minimize(gps)
+    assert len(minimal) == len(set(minimal))
+    assert set(minimal) == set(
+        gp for gp in gps if not any(o in gp for o in gps if len(o) < len(gp))
+    )
+    assert GriddedPermReduction._minimize([]) == tuple()
+    empty = GriddedPerm.empty_perm()
+    assert GriddedPermReduction._minimize(gps + [empty]) == (empty,)
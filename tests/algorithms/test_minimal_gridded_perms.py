@@ -1,8 +1,11 @@
+from concurrent.futures import ProcessPoolExecutor
+
 import pytest
 
 from permuta import Perm
 from tilings import GriddedPerm, Tiling
 from tilings.algorithms import MinimalGriddedPerms
+from tilings.algorithms.minimal_gridded_perms import TargetTables
 
 tilings = [
     # Testing glueing indep cells
@@ -308,6 +311,17 @@ def test_minimal_gridded_perms(tiling, expected_mgps):
         curr_len = len(gp)
 
 
+@pytest.mark.parametrize(("tiling", "expected_mgps"), zip(tilings, expected_mgps))
+def test_parallel_minimal_gridded_perms(tiling, expected_mgps):
+    with ProcessPoolExecutor(2) as executor:
+        mgps = list(
+            MinimalGriddedPerms(tiling).parallel_minimal_gridded_perms(executor, 4)
+        )
+    assert frozenset(mgps) == expected_mgps
+    assert len(mgps) == len(expected_mgps)
+    assert [len(gp) for gp in mgps] == sorted(len(gp) for gp in mgps)
+
+
 def test_order():
     """
     We expect the gps to be always from the shortest to the longest one.
@@ -351,3 +365,67 @@ def test_order():
         GriddedPerm(Perm([3, 1, 0, 2]), [(1, 2), (2, 1), (2, 1), (2, 1)]),
         GriddedPerm(Perm([1, 3, 2, 4, 0]), [(1, 2), (2, 3), (2, 3), (2, 3), (2, 1)]),
     ]
+
+
+@pytest.mark.parametrize(("tiling", "expected_mgps"), zip(tilings, expected_mgps))
+def test_witness(tiling, expected_mgps):
+    gp = MinimalGriddedPerms(tiling).witness()
+    assert gp is not None
+    assert gp.avoids(*tiling.obstructions)
+    assert all(gp.contains(*req) for req in tiling.requirements)
+    assert any(mgp in gp for mgp in expected_mgps)
+
+
+def test_witness_empty():
+    t = Tiling(
+        obstructions=(
+            GriddedPerm(Perm((0, 1)), ((0, 0), (1, 0))),
+            GriddedPerm(Perm((1, 0)), ((0, 0), (1, 0))),
+        ),
+        requirements=(
+            (GriddedPerm(Perm((0,)), ((0, 0),)),),
+            (GriddedPerm(Perm((0,)), ((1, 0),)),),
+        ),
+        simplify=False,
+    )
+    assert MinimalGriddedPerms(t).witness() is None
+    assert t.is_empty()
+    t = Tiling(
+        obstructions=(GriddedPerm(Perm((0, 1)), ((0, 0), (1, 0))),),
+        requirements=(
+            (GriddedPerm(Perm((0,)), ((0, 0),)),),
+            (GriddedPerm(Perm((0,)), ((1, 0),)),),
+        ),
+        simplify=False,
+    )
+    assert MinimalGriddedPerms(t).witness() == GriddedPerm(
+        Perm((1, 0)), ((0, 0), (1, 0))
+    )
+
+
+def test_shared_tables():
+    MinimalGriddedPerms.set_shared_tables_maxsize(2)
+    try:
+        tables = MinimalGriddedPerms.shared_tables()
+        assert MinimalGriddedPerms(tilings[0]).upward_closures is tables.upward_closures
+        for t in tilings:
+            list(MinimalGriddedPerms(t).minimal_gridded_perms())
+        stats = tables.stats()
+        assert all(table["size"] <= 2 for table in stats.values())
+        assert stats["upward_closures"]["misses"] > 0
+        own = TargetTables()
+        mgps = list(MinimalGriddedPerms(tilings[1], own).minimal_gridded_perms())
+        assert frozenset(mgps) == expected_mgps[1]
+        assert own.stats()["upward_closures"]["misses"] > 0
+        own.clear()
+        assert own.stats()["upward_closures"]["misses"] == 0
+    finally:
+        MinimalGriddedPerms.set_shared_tables_maxsize(100000)
+
+
+@pytest.mark.parametrize(("tiling", "expected_mgps"), zip(tilings, expected_mgps))
+def test_known_patts_maxsize(tiling, expected_mgps):
+    m = MinimalGriddedPerms(tiling, known_patts_maxsize=2)
+    assert frozenset(m.minimal_gridded_perms()) == expected_mgps
+    assert len(m.known_patts) <= 2
+    assert m.peak_sizes["known_patts"] <= 2
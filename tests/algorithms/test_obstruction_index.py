@@ -0,0 +1,46 @@
+import pytest
+
+from permuta import Perm
+from tilings import GriddedPerm, Tiling
+from tilings.algorithms import ObstructionIndex
+
+
+@pytest.fixture
+def tiling():
+    return Tiling(
+        obstructions=[
+            GriddedPerm(Perm((0, 1)), [(0, 0), (1, 0)]),
+            GriddedPerm(Perm((0, 2, 1)), [(0, 0), (0, 0), (0, 0)]),
+            GriddedPerm(Perm((1, 0)), [(1, 0), (1, 0)]),
+            GriddedPerm(Perm((0, 1, 2)), [(0, 0), (0, 1), (0, 1)]),
+            GriddedPerm(Perm((2, 1, 0)), [(0, 1), (0, 1), (0, 1)]),
+        ]
+    )
+
+
+def test_obstructions_fitting(tiling):
+    index = ObstructionIndex(tiling.obstructions)
+    assert len(index) == len(tiling.obstructions)
+    assert tuple(index) == tiling.obstructions
+    gp = GriddedPerm(Perm((1, 0, 2)), [(0, 0), (0, 0), (1, 0)])
+    assert set(index.obstructions_fitting(gp)) == {
+        GriddedPerm(Perm((0, 1)), [(0, 0), (1, 0)])
+    }
+    gp = GriddedPerm(Perm((0, 1)), [(0, 1), (1, 0)])
+    assert not any(index.obstructions_fitting(gp))
+    assert set(index.obstructions_fitting(GriddedPerm.empty_perm())) == set()
+
+
+def test_avoids(tiling):
+    index = tiling.obstruction_index
+    assert tiling.obstruction_index is index
+    gps = list(Tiling(tiling.obstructions[:2]).gridded_perms(4))
+    gps.extend(ob for ob in tiling.obstructions)
+    for gp in gps:
+        assert index.avoids(gp) == gp.avoids(*tiling.obstructions)
+        assert index.contains(gp) == gp.contains(*tiling.obstructions)
+        for i in range(len(gp)):
+            assert index.contains_using_point(gp, i) == any(
+                i in occ for ob in tiling.obstructions for occ in ob.occurrences_in(gp)
+            )
+            assert index.avoids_using_point(gp, i) != index.contains_using_point(gp, i)
@@ -1,3 +1,5 @@
+import pickle
+
 import pytest
 
 from permuta import Perm
@@ -94,6 +96,28 @@ def test_occurrences_in(simpleob):
     assert ob in ob
 
 
+def test_occurrences_in_using_point(simpleob):
+    ob = GriddedPerm(Perm((0, 2, 1)), ((0, 0), (2, 2), (2, 1)))
+    assert list(ob.occurrences_in_using_point(simpleob, 0)) == [(0, 2, 3)]
+    assert list(ob.occurrences_in_using_point(simpleob, 1)) == [(1, 2, 3)]
+    assert list(ob.occurrences_in_using_point(simpleob, 3)) == [(0, 2, 3), (1, 2, 3)]
+    assert ob.occurs_in_using_point(simpleob, 2)
+    assert simpleob.contains_using_point(1, ob)
+
+    ob = GriddedPerm(Perm((1, 0, 2)), ((0, 0), (0, 0), (2, 1)))
+    assert list(ob.occurrences_in_using_point(simpleob, 3)) == [(0, 1, 3)]
+    assert not ob.occurs_in_using_point(simpleob, 2)
+    assert simpleob.avoids_using_point(2, ob)
+    assert not simpleob.avoids_using_point(0, ob)
+
+    for gp in (simpleob, GriddedPerm(Perm((2, 0, 3, 1, 4)), ((0, 0),) * 5)):
+        for patt in gp.all_subperms(proper=False):
+            for index in range(len(gp)):
+                assert sorted(patt.occurrences_in_using_point(gp, index)) == sorted(
+                    occ for occ in patt.occurrences_in(gp) if index in occ
+                )
+
+
 def test_remove_cells(simpleob):
     assert simpleob.remove_cells([(0, 0)]) == GriddedPerm(
         Perm((1, 0)), ((2, 2), (2, 1))
@@ -364,3 +388,66 @@ def test_compression(simpleob, singlecellob, everycellob, typicalob, isolatedob)
     assert everycellob == GriddedPerm.decompress(everycellob.compress())
     assert typicalob == GriddedPerm.decompress(typicalob.compress())
     assert isolatedob == GriddedPerm.decompress(isolatedob.compress())
+    # decompressed gridded perms share their cells
+    gp1 = GriddedPerm.decompress(typicalob.compress())
+    gp2 = GriddedPerm.decompress(typicalob.compress())
+    assert all(c1 is c2 for c1, c2 in zip(gp1.pos, gp2.pos))
+
+
+def test_write_and_read_bytes(simpleob, everycellob, typicalob, isolatedob):
+    buf = bytearray()
+    gps = [
+        simpleob,
+        everycellob,
+        typicalob,
+        isolatedob,
+        GriddedPerm.empty_perm(),
+        GriddedPerm(Perm((1, 0, 2)), ((0, 300), (12, 4), (1000, 2))),
+        GriddedPerm(Perm(range(200, -1, -1)), ((0, 0),) * 201),
+    ]
+    for gp in gps:
+        gp.write_bytes(buf)
+    offset = 0
+    view = memoryview(bytes(buf))
+    for gp in gps:
+        res, offset = GriddedPerm.read_bytes(view, offset)
+        assert res == gp
+    assert offset == len(buf)
+    # a gridded perm in a single small cell takes one byte per value and cell
+    buf = bytearray()
+    typicalob.write_bytes(buf)
+    assert len(buf) == 1 + 2 * len(typicalob)
+
+
+def test_pickle(typicalob, isolatedob):
+    for gp in (typicalob, isolatedob, GriddedPerm.empty_perm()):
+        assert gp == GriddedPerm.from_bytes(gp.to_bytes())
+        assert gp == pickle.loads(pickle.dumps(gp))
+    assert pickle.loads(pickle.dumps([typicalob, typicalob])) == [typicalob] * 2
+
+
+def test_lazy_cells_and_hash(typicalob, simpleob):
+    gp = GriddedPerm(typicalob.patt, typicalob.pos)
+    assert gp._cells is None and gp._hash is None
+    assert gp.occupies((1, 1)) and not gp.occupies((2, 2))
+    assert gp._cells == frozenset([(0, 0), (1, 0), (1, 1)])
+    assert hash(gp) == hash(typicalob)
+    assert hash(gp) == gp._hash
+    assert gp != simpleob
+
+
+def test_interning(typicalob):
+    assert not GriddedPerm.interning_enabled()
+    gp1 = GriddedPerm(typicalob.patt, typicalob.pos)
+    assert gp1.interned() is gp1
+    GriddedPerm.enable_interning()
+    try:
+        gp1 = GriddedPerm(typicalob.patt, typicalob.pos).interned()
+        gp2 = GriddedPerm(typicalob.patt, typicalob.pos).interned()
+        assert gp1 is gp2
+        assert GriddedPerm.interning_stats() == {"lookups": 2, "hits": 1, "size": 1}
+        del gp1, gp2
+        assert GriddedPerm.interning_stats()["size"] == 0
+    finally:
+        GriddedPerm.disable_interning()
+    assert GriddedPerm.interning_stats() == {"lookups": 0, "hits": 0, "size": 0}
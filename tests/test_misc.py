@@ -1,4 +1,6 @@
-from tilings.misc import intersection_reduce, is_tree, partitions_iterator
+import pytest
+
+from tilings.misc import LRUCache, intersection_reduce, is_tree, partitions_iterator
 
 
 def test_partitions_iterator():
@@ -21,3 +23,25 @@ def test_is_tree():
     assert not is_tree([0, 1, 2], [(0, 1)])
     assert is_tree([0, 1, 2], [(0, 1), (1, 2)])
     assert not is_tree([0, 1, 2], [(0, 1), (1, 2), (2, 0)])
+
+
+def test_lru_cache():
+    cache = LRUCache(maxsize=2)
+    cache["a"], cache["b"] = 1, 2
+    assert cache.get("a") == 1
+    cache["c"] = 3
+    assert "b" not in cache
+    assert "a" in cache and "c" in cache
+    assert cache.get("b", 0) == 0
+    assert cache.stats() == {
+        "hits": 1,
+        "misses": 1,
+        "hit_rate": 0.5,
+        "size": 2,
+        "maxsize": 2,
+    }
+    assert cache.pop("a") == 1 and cache.pop("a") is None
+    cache.clear()
+    assert len(cache) == 0 and cache.hit_rate == 0.0
+    with pytest.raises(ValueError):
+        LRUCache(0)
@@ -9,6 +9,7 @@ from comb_spec_searcher.utils import taylor_expand
 from permuta import Perm
 from tilings import GriddedPerm, Tiling
 from tilings import strategies as strat
+from tilings.algorithms import EmptinessChecker, MinimalGriddedPerms
 from tilings.strategies.fusion import ComponentFusionStrategy, FusionStrategy
 from tilings.strategy_pack import TileScopePack
 from tilings.tilescope import TileScope
@@ -112,6 +113,22 @@ def test_123_with_db():
     assert isinstance(spec, CombinatorialSpecification)
 
 
+@pytest.mark.timeout(20)
+def test_123_with_cache_dir(tmp_path):
+    try:
+        for _ in range(2):
+            searcher = TileScope(
+                "123", point_placements_fusion, cache_dir=str(tmp_path)
+            )
+            spec = searcher.auto_search(smallest=True)
+            assert isinstance(spec, CombinatorialSpecification)
+        assert EmptinessChecker.cache().stats()["hits"] > 0
+    finally:
+        EmptinessChecker.disable_cache()
+        MinimalGriddedPerms.set_better_bounds_file(None)
+    assert EmptinessChecker.cache() is None
+
+
 @pytest.mark.timeout(20)
 def test_1342_1423():
     searcher = TileScope("1342_1423", point_placements_component_fusion)
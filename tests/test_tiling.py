@@ -1,11 +1,16 @@
 import json
+import pickle
+import random
+from collections import Counter
 from itertools import chain, product
 
 import pytest
 import sympy
 
+from comb_spec_searcher import CombinatorialClass
 from permuta import Perm
 from tilings import GriddedPerm, Tiling
+from tilings.assumptions import SumComponentAssumption, TrackingAssumption
 from tilings.exception import InvalidOperationError
 
 
@@ -490,6 +495,76 @@ def test_bytes(compresstil):
         compresstil.to_bytes()
         == Tiling(compresstil.obstructions, compresstil.requirements).to_bytes()
     )
+    assert compresstil.to_bytes().startswith(b"\xff\xff\x02")
+    assert compresstil == Tiling.from_bytes(compresstil.to_bytes(version=1))
+    assert len(compresstil.to_bytes()) < len(compresstil.to_bytes(version=1))
+    with pytest.raises(ValueError):
+        compresstil.to_bytes(version=3)
+    # version 2 has no limit on the number of rows and columns
+    big = Tiling(
+        [
+            GriddedPerm(Perm((0, 1)), ((0, 0), (299, 0))),
+            GriddedPerm(Perm((1, 0)), ((0, 0), (0, 299))),
+            GriddedPerm(Perm((0, 1)), ((0, 299), (299, 299))),
+        ],
+        remove_empty_rows_and_cols=False,
+        derive_empty=False,
+    )
+    assert big == Tiling.from_bytes(big.to_bytes())
+
+
+def test_pickle(compresstil):
+    compresstil.active_cells
+    assert compresstil._cached_properties
+    pickled = pickle.dumps(compresstil)
+    assert len(pickled) < len(compresstil.to_bytes()) + 100
+    unpickled = pickle.loads(pickled)
+    assert unpickled == compresstil
+    assert unpickled._cached_properties == {}
+    assert unpickled.dimensions == compresstil.dimensions
+    empty = Tiling([GriddedPerm.empty_perm()])
+    assert pickle.loads(pickle.dumps(empty)) == empty
+
+
+def test_interning(compresstil):
+    GriddedPerm.enable_interning()
+    try:
+        t1 = Tiling.from_bytes(compresstil.to_bytes())
+        t2 = Tiling.from_bytes(compresstil.to_bytes())
+        assert t1 == t2 == compresstil
+        assert all(ob1 is ob2 for ob1, ob2 in zip(t1.obstructions, t2.obstructions))
+        assert all(
+            r1 is r2
+            for req1, req2 in zip(t1.requirements, t2.requirements)
+            for r1, r2 in zip(req1, req2)
+        )
+    finally:
+        GriddedPerm.disable_interning()
+
+
+def test_construction_cache(compresstil):
+    assert not Tiling.construction_cache_enabled()
+    Tiling.enable_construction_cache(maxsize=2)
+    try:
+        t1 = Tiling(compresstil.obstructions, compresstil.requirements)
+        t2 = Tiling(iter(compresstil.obstructions), compresstil.requirements)
+        assert t1 == t2 == compresstil
+        assert t1.obstructions is t2.obstructions
+        assert t1.requirements is t2.requirements
+        stats = Tiling.construction_cache_stats()
+        assert (stats["hits"], stats["misses"], stats["size"]) == (1, 1, 1)
+        assert stats["hit_rate"] == 0.5
+        # The flags of the constructor are part of the key.
+        t3 = Tiling(compresstil.obstructions, derive_empty=False)
+        assert t3 == Tiling(compresstil.obstructions, derive_empty=False)
+        assert Tiling.construction_cache_stats()["hits"] == 2
+        assert t3.obstructions is not t1.obstructions
+        # Tilings that are not simplified are never cached.
+        Tiling(compresstil.obstructions, simplify=False)
+        assert Tiling.construction_cache_stats()["size"] == 2
+    finally:
+        Tiling.disable_construction_cache()
+    assert Tiling.construction_cache_stats()["size"] == 0
 
 
 def test_json(compresstil):
@@ -629,6 +704,37 @@ def test_add_obstruction(compresstil):
     )
 
 
+def test_add_obstructions_matches_constructor(compresstil):
+    obs = (
+        GriddedPerm(Perm((0, 1)), ((0, 0), (0, 1))),
+        GriddedPerm(Perm((0, 1)), ((0, 0), (0, 0))),
+        GriddedPerm(Perm((0, 1, 2)), ((0, 0), (0, 0), (0, 1))),
+    )
+    assert compresstil.add_obstructions(obs) == Tiling(
+        compresstil.obstructions + obs, compresstil.requirements
+    )
+    # The obstructions of the tiling containing a new one are removed.
+    assert not any(
+        len(ob) == 3 and ob.pos == ((0, 0), (0, 0), (0, 0))
+        for ob in compresstil.add_obstructions(obs).obstructions
+    )
+
+
+def test_add_assumptions(compresstil):
+    assumptions = [
+        TrackingAssumption([GriddedPerm(Perm((0,)), ((0, 0),))]),
+        TrackingAssumption([GriddedPerm(Perm((0,)), ((1, 0),))]),
+        TrackingAssumption(
+            [GriddedPerm(Perm((0,)), ((0, 1),)), GriddedPerm(Perm((0,)), ((2, 0),))]
+        ),
+    ]
+    tiling = compresstil.add_assumptions(assumptions)
+    assert tiling == Tiling(
+        compresstil.obstructions, compresstil.requirements, assumptions
+    )
+    assert tiling.add_assumption(assumptions[0]) == tiling
+
+
 def test_add_list_requirement(finite_tiling):
     list_req = [
         GriddedPerm(Perm((1, 0)), ((0, 0), (0, 0))),
@@ -841,6 +947,10 @@ def test_only_cell_in_row_or_col(
     assert tiling.only_cell_in_row((2, 3))
     assert not tiling.only_cell_in_row((3, 1))
     assert not tiling.only_cell_in_col((3, 1))
+    assert not tiling.only_cell_in_row_and_col((2, 3))
+    tiling = Tiling([GriddedPerm(Perm((0, 1)), ((0, 0), (1, 1)))])
+    assert tiling.only_cell_in_row_and_col((0, 0))
+    assert not tiling.only_cell_in_row_and_col((1, 0))
 
 
 def test_cells_in_row_col(
@@ -1113,6 +1223,143 @@ def test_gridded_perms():
         GriddedPerm(Perm((1, 0)), [(1, 0), (1, 0)]),
     ]
 
+    # The requirements span several columns, so they are pruned column by
+    # column as the search moves right.
+    obstructions = [
+        GriddedPerm.single_cell(Perm((0, 1, 2)), (0, 0)),
+        GriddedPerm.single_cell(Perm((2, 1, 0)), (1, 0)),
+        GriddedPerm.single_cell(Perm((0, 1)), (2, 0)),
+    ]
+    requirements = [
+        [GriddedPerm.single_cell(Perm((1, 0)), (0, 0))],
+        [
+            GriddedPerm(Perm((1, 0)), [(0, 0), (2, 0)]),
+            GriddedPerm(Perm((0, 1)), [(1, 0), (2, 0)]),
+        ],
+        [GriddedPerm(Perm((0, 2, 1)), [(0, 0), (1, 0), (2, 0)])],
+    ]
+    tiling = Tiling(obstructions, requirements)
+    griddable = sorted(tiling.gridded_perms(maxlen=6))
+    assert griddable == sorted(
+        gp
+        for gp in Tiling(obstructions).gridded_perms(maxlen=6)
+        if all(gp.contains(*reqlist) for reqlist in requirements)
+    )
+
+
+def test_count_gridded_perms(christian_til):
+    def counts(tiling, maxlen):
+        res = [0] * (maxlen + 1)
+        for gp in tiling.gridded_perms(maxlen):
+            res[len(gp)] += 1
+        return res
+
+    assert Tiling().count_gridded_perms(3) == [1, 0, 0, 0]
+    assert Tiling([GriddedPerm.empty_perm()]).count_gridded_perms(2) == [0, 0, 0]
+    # The cells in the first column share no obstruction or requirement with
+    # the second column, so their points are dropped from the cached states.
+    tiling = Tiling(
+        [
+            GriddedPerm.single_cell(Perm((0, 1, 2)), (0, 0)),
+            GriddedPerm.single_cell(Perm((0, 1)), (0, 1)),
+            GriddedPerm.single_cell(Perm((0, 2, 1)), (1, 0)),
+            GriddedPerm(Perm((1, 0)), [(0, 0), (0, 0)]),
+        ],
+        [[GriddedPerm.single_cell(Perm((0,)), (1, 1))]],
+    )
+    assert tiling.count_gridded_perms(6) == counts(tiling, 6)
+    assert christian_til.count_gridded_perms(4) == counts(christian_til, 4)
+
+
+def test_gridded_perms_by_length(christian_til):
+    def by_length(tiling, maxlen):
+        res = [set() for _ in range(maxlen + 1)]
+        for gp in tiling.gridded_perms(maxlen):
+            res[len(gp)].add(gp)
+        return res
+
+    assert list(Tiling().gridded_perms_by_length(2)) == [
+        [GriddedPerm.empty_perm()],
+        [],
+        [],
+    ]
+    assert list(Tiling([GriddedPerm.empty_perm()]).gridded_perms_by_length(1)) == [
+        [],
+        [],
+    ]
+    tiling = Tiling(
+        obstructions=christian_til.obstructions,
+        requirements=[[GriddedPerm(Perm((0, 1)), [(0, 0), (1, 1)])]],
+    )
+    for til, maxlen in ((christian_til, 5), (tiling, 5)):
+        layers = list(til.gridded_perms_by_length(maxlen))
+        assert len(layers) == maxlen + 1
+        assert all(len(layer) == len(set(layer)) for layer in layers)
+        assert [set(layer) for layer in layers] == by_length(til, maxlen)
+
+
+def test_count_by_parameters():
+    tiling = Tiling(
+        [
+            GriddedPerm.single_cell(Perm((0, 2, 1)), (0, 0)),
+            GriddedPerm.single_cell(Perm((0, 2, 1)), (1, 0)),
+            GriddedPerm(Perm((0, 1)), [(0, 0), (1, 0)]),
+        ],
+        assumptions=[
+            TrackingAssumption([GriddedPerm.single_cell(Perm((0,)), (0, 0))]),
+            TrackingAssumption([GriddedPerm(Perm((1, 0)), [(0, 0), (1, 0)])]),
+            SumComponentAssumption([GriddedPerm.single_cell(Perm((0,)), (1, 0))]),
+        ],
+    )
+    counts = Counter(
+        tuple(ass.get_value(gp) for ass in tiling.assumptions)
+        for gp in tiling.gridded_perms_of_length(5)
+    )
+    assert tiling.count_by_parameters(5) == counts
+    for gp, values in tiling.gridded_perms_with_parameters(5, k_0=2):
+        assert values == tuple(ass.get_value(gp) for ass in tiling.assumptions)
+    assert sorted(tiling.objects_of_size(5, k_0=2, k_1=3, k_2=1)) == sorted(
+        gp
+        for gp in tiling.gridded_perms_of_length(5)
+        if tuple(ass.get_value(gp) for ass in tiling.assumptions) == (2, 3, 1)
+    )
+    # The generic initial conditions count the gridded perms once for each
+    # choice of parameters, which is only done for point assumptions.
+    tiling = tiling.remove_assumptions().add_assumptions(
+        [
+            TrackingAssumption([GriddedPerm.single_cell(Perm((0,)), (0, 0))]),
+            TrackingAssumption([GriddedPerm.single_cell(Perm((0,)), (1, 0))]),
+        ]
+    )
+    assert tiling.initial_conditions(4) == CombinatorialClass.initial_conditions(
+        tiling, 4
+    )
+
+
+def test_random_gridded_perm(christian_til):
+    rng = random.Random(0)
+    gps = set(christian_til.gridded_perms_of_length(5))
+    sample = christian_til.random_gridded_perms(5, 20 * len(gps), rng)
+    assert len(sample) == 20 * len(gps)
+    assert set(sample) == gps
+    gp = christian_til.random_gridded_perm(6, rng)
+    assert gp in set(christian_til.gridded_perms_of_length(6))
+    assert christian_til.random_gridded_perms(6, 5, random.Random(1)) == (
+        christian_til.random_gridded_perms(6, 5, random.Random(1))
+    )
+    with pytest.raises(ValueError):
+        Tiling([GriddedPerm.empty_perm()]).random_gridded_perm(3)
+
+
+def test_gridded_perms_processes(christian_til):
+    gps = list(christian_til.gridded_perms(5))
+    assert list(christian_til.gridded_perms(5, processes=2)) == gps
+    counts = [0] * 6
+    for gp in gps:
+        counts[len(gp)] += 1
+    assert christian_til.count_gridded_perms(5, processes=2) == counts
+    assert list(Tiling([GriddedPerm.empty_perm()]).gridded_perms(3, processes=2)) == []
+
 
 @pytest.fixture
 def christian_til():
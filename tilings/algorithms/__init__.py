@@ -1,9 +1,11 @@
+from .emptiness import EmptinessCache, EmptinessChecker
 from .enumeration import DatabaseEnumeration, LocalEnumeration, MonotoneTreeEnumeration
 from .factor import Factor, FactorWithInterleaving, FactorWithMonotoneInterleaving
 from .fusion import ComponentFusion, Fusion
 from .gridded_perm_generation import GriddedPermsOnTiling
 from .gridded_perm_reduction import GriddedPermReduction
 from .minimal_gridded_perms import MinimalGriddedPerms
+from .obstruction_index import ObstructionIndex
 from .obstruction_inferral import (
     AllObstructionInferral,
     EmptyCellInferral,
@@ -15,6 +17,8 @@ from .row_col_separation import RowColSeparation
 
 __all__ = [
     "DatabaseEnumeration",
+    "EmptinessCache",
+    "EmptinessChecker",
     "LocalEnumeration",
     "MonotoneTreeEnumeration",
     "Factor",
@@ -25,6 +29,7 @@ __all__ = [
     "MinimalGriddedPerms",
     "AllObstructionInferral",
     "EmptyCellInferral",
+    "ObstructionIndex",
     "SubobstructionInferral",
     "ObstructionTransitivity",
     "GriddedPermsOnTiling",
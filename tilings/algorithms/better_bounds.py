@@ -1,5 +1,229 @@
+import json
+import os
+from functools import lru_cache, partial
+from typing import (
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
 from permuta import Perm
 
+__all__ = ["BetterBounds", "superpattern_bound"]
+
+Walk = Tuple[Tuple[int, int], ...]
+
+_SYMMETRIES: Tuple[Callable[[Perm], Perm], ...] = (
+    Perm.reverse,
+    Perm.complement,
+    Perm.inverse,
+    Perm.flip_antidiagonal,
+    partial(Perm.rotate, times=1),
+    partial(Perm.rotate, times=2),
+    partial(Perm.rotate, times=3),
+)
+
+
+@lru_cache(maxsize=None)
+def _position_walks(len_p: int, len_q: int) -> Tuple[Walk, ...]:
+    """
+    Return the ways of placing the points of perms of length len_p and len_q
+    from left to right. Each step of a walk is a pair (i, j) saying the next
+    point is the i-th point of the first perm and the j-th point of the second
+    perm, where -1 means it is not a point of that perm.
+    """
+    if len_p == 0 and len_q == 0:
+        return ((),)
+    res: List[Walk] = []
+    if len_p > 0:
+        res.extend(w + ((len_p - 1, -1),) for w in _position_walks(len_p - 1, len_q))
+    if len_q > 0:
+        res.extend(w + ((-1, len_q - 1),) for w in _position_walks(len_p, len_q - 1))
+    if len_p > 0 and len_q > 0:
+        res.extend(
+            w + ((len_p - 1, len_q - 1),) for w in _position_walks(len_p - 1, len_q - 1)
+        )
+    return tuple(res)
+
+
+def _merges(
+    p: Perm, q: Perm, length: Optional[int] = None, shared: FrozenSet[int] = frozenset()
+) -> Set[Perm]:
+    """
+    Return the perms that are the union of an occurrence of p and an
+    occurrence of q, such that the points of p with an index in shared are
+    also in the occurrence of q. If length is given, only the perms of that
+    length are returned.
+    """
+    res: Set[Perm] = set()
+    for walk in _position_walks(len(p), len(q)):
+        if length is not None and len(walk) != length:
+            continue
+        both = [k for k, (i, j) in enumerate(walk) if i != -1 and j != -1]
+        if not shared.issubset(walk[k][0] for k in both):
+            continue
+        if Perm.to_standard(p[walk[k][0]] for k in both) != Perm.to_standard(
+            q[walk[k][1]] for k in both
+        ):
+            continue
+        # the points ordered by their values in p and in q, which we merge
+        porder = sorted(
+            (k for k, (i, _) in enumerate(walk) if i != -1), key=lambda k: p[walk[k][0]]
+        )
+        qorder = sorted(
+            (k for k, (_, j) in enumerate(walk) if j != -1), key=lambda k: q[walk[k][1]]
+        )
+        res.update(_value_merges(porder, qorder, frozenset(both), len(walk)))
+    return res
+
+
+def _value_merges(
+    porder: List[int], qorder: List[int], both: FrozenSet[int], length: int
+) -> Iterator[Perm]:
+    """Yield the perms whose values restricted to the points in porder and in
+    qorder are in that order, where the points in both are in each of them."""
+    vals = [0] * length
+
+    def rec(x: int, y: int, val: int) -> Iterator[Perm]:
+        if val == length:
+            yield Perm(vals)
+            return
+        phead = porder[x] if x < len(porder) else -1
+        qhead = qorder[y] if y < len(qorder) else -1
+        if phead != -1 and phead == qhead:
+            vals[phead] = val
+            yield from rec(x + 1, y + 1, val + 1)
+            return
+        if phead != -1 and phead not in both:
+            vals[phead] = val
+            yield from rec(x + 1, y, val + 1)
+        if qhead != -1 and qhead not in both:
+            vals[qhead] = val
+            yield from rec(x, y + 1, val + 1)
+
+    return rec(0, 0, 0)
+
+
+def _deletable(perm: Perm, patts: Iterable[Perm]) -> FrozenSet[int]:
+    """Return the indices of the points of perm that can be removed with perm
+    still containing every patt. These are the points not in every occurrence
+    of some patt."""
+    needed: Set[int] = set()
+    for patt in patts:
+        occs = patt.occurrences_in(perm)
+        core = set(next(occs, ()))
+        for occ in occs:
+            core.intersection_update(occ)
+            if not core:
+                break
+        needed.update(core)
+    return frozenset(range(len(perm))) - needed
+
+
+def _is_minimal(perm: Perm, patts: Tuple[Perm, ...]) -> bool:
+    """Return True if no point of perm can be removed with perm still
+    containing every patt, given that it contains them."""
+    # Every point must be in each occurrence of some patt, so the cores of
+    # the patts can only miss sum(map(len, patts)) - len(perm) points.
+    slack = sum(map(len, patts)) - len(perm)
+    for patt in patts:
+        occs = patt.occurrences_in(perm)
+        core = set(next(occs))
+        for occ in occs:
+            core.intersection_update(occ)
+            if len(patt) - len(core) > slack:
+                return False
+        slack -= len(patt) - len(core)
+    return not _deletable(perm, patts)
+
+
+def superpattern_bound(patts: Iterable[Perm]) -> int:
+    """
+    Return the length of the longest minimal perm containing every patt.
+
+    A minimal perm is the union of an occurrence of each patt, so the perms
+    are built by merging the patts one at a time. If a point of such a union
+    can be removed with the union still containing the patts merged so far,
+    then in a minimal perm it must be in an occurrence of a patt merged
+    later, so the unions with more such points than the later patts have are
+    dropped, and the last patt must include them all.
+    """
+    patts = tuple(sorted(set(patts), key=lambda p: (-len(p), p)))
+    if len(patts) == 1:
+        return len(patts[0])
+    unions = {patts[0]}
+    for idx in range(1, len(patts) - 1):
+        later = sum(map(len, patts[idx:]))
+        unions = set(
+            merge
+            for union in unions
+            if len(_deletable(union, patts[:idx])) <= later
+            for merge in _merges(union, patts[idx])
+        )
+    last = patts[-1]
+    shared: Dict[Perm, FrozenSet[int]] = {}
+    for union in unions:
+        deletable = _deletable(union, patts[:-1])
+        if len(deletable) <= len(last):
+            shared[union] = deletable
+    for length in range(max(map(len, shared)) + len(last), len(last) - 1, -1):
+        merges = set(
+            merge
+            for union, deletable in shared.items()
+            for merge in _merges(union, last, length, deletable)
+        )
+        # the shortest patts tend to rule out a merge soonest
+        if any(_is_minimal(merge, patts[::-1]) for merge in merges):
+            return length
+    raise ValueError("The patts have no minimal superpattern.")
+
+
+class BetterBounds(Dict[FrozenSet[Perm], int]):
+    """
+    A dictionary whose entry k:v means that if a cell contains the full
+    requirements in k, and no others touch it, then the upper bound for the
+    number of points that will need to be placed in that cell is the sum of
+    the lengths of the perms in k, minus v.
+
+    It starts with the precomputed values in better_bounds, and the values for
+    other sets are computed with superpattern_bound when they are looked up.
+    If a path is given, the values in the file are read, and the computed
+    values are appended to it.
+    """
+
+    FILENAME = "better_bounds.jsonl"
+
+    def __init__(self, path: Optional[str] = None):
+        super().__init__(better_bounds)
+        self.path = path
+        if path is not None and os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    patts, value = json.loads(line)
+                    self[frozenset(Perm(patt) for patt in patts)] = value
+
+    def __missing__(self, patts: FrozenSet[Perm]) -> int:
+        # the bounds are the same for the symmetries of the set
+        for symmetry in _SYMMETRIES:
+            sym_patts = frozenset(map(symmetry, patts))
+            if sym_patts in self:
+                value = self[sym_patts]
+                break
+        else:
+            value = sum(map(len, patts)) - superpattern_bound(patts)
+        self[patts] = value
+        if self.path is not None:
+            with open(self.path, "a") as f:
+                f.write(json.dumps([sorted(patts), value]) + "\n")
+        return value
+
+
 better_bounds = {
     frozenset({Perm((0, 1)), Perm((1, 0))}): 1,
     frozenset({Perm((1, 0)), Perm((0, 1, 2))}): 1,
@@ -0,0 +1,274 @@
+import atexit
+import os
+import sqlite3
+from collections import Counter
+from itertools import combinations
+from typing import TYPE_CHECKING, Dict, FrozenSet, List, Optional, Tuple
+
+from permuta import Perm
+
+from ..griddedperm import GriddedPerm
+from .minimal_gridded_perms import MinimalGriddedPerms
+
+if TYPE_CHECKING:
+    from tilings import Tiling
+
+Cell = Tuple[int, int]
+
+__all__ = ["EmptinessCache", "EmptinessChecker"]
+
+
+class EmptinessCache:
+    """
+    A persistent memo of emptiness results, stored in an sqlite database.
+
+    The keys are bytes, in practice Tiling.to_bytes. New results are kept in
+    memory and written in batches of batch_size, and when flushing makes the
+    database hold more than maxsize results the oldest are deleted. Several
+    processes can share the database, each opening its own connection.
+    """
+
+    FILENAME = "emptiness.sqlite3"
+
+    def __init__(self, cache_dir: str, maxsize: int = 1000000, batch_size: int = 1000):
+        if maxsize < 1:
+            raise ValueError("The maxsize of the cache should be positive.")
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, EmptinessCache.FILENAME)
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.hits = 0
+        self.misses = 0
+        self._pending: Dict[bytes, bool] = {}
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid = -1
+        # The connections inherited from a parent process are kept, as closing
+        # them in a forked process is not safe.
+        self._inherited: List[sqlite3.Connection] = []
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return the connection of this process, opening it if needed. A
+        connection is never used in a process forked after it was opened."""
+        if self._conn is None or self._pid != os.getpid():
+            if self._conn is not None:
+                self._inherited.append(self._conn)
+            conn = sqlite3.connect(self.path, timeout=60)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS emptiness "
+                "(key BLOB PRIMARY KEY, empty INTEGER NOT NULL)"
+            )
+            conn.commit()
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def get(self, key: bytes) -> Optional[bool]:
+        """Return the result stored for key, or None if there is none."""
+        res = self._pending.get(key)
+        if res is None:
+            row = (
+                self._connection()
+                .execute("SELECT empty FROM emptiness WHERE key = ?", (key,))
+                .fetchone()
+            )
+            if row is not None:
+                res = bool(row[0])
+        if res is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return res
+
+    def __setitem__(self, key: bytes, empty: bool) -> None:
+        self._pending[key] = empty
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the pending results to the database, and delete the oldest
+        results if there are more than maxsize."""
+        if not self._pending:
+            return
+        conn = self._connection()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO emptiness VALUES (?, ?)",
+                self._pending.items(),
+            )
+            (size,) = conn.execute("SELECT COUNT(*) FROM emptiness").fetchone()
+            if size > self.maxsize:
+                conn.execute(
+                    "DELETE FROM emptiness WHERE rowid IN "
+                    "(SELECT rowid FROM emptiness ORDER BY rowid LIMIT ?)",
+                    (size - self.maxsize,),
+                )
+        self._pending.clear()
+
+    def close(self) -> None:
+        """Flush the pending results and close the connection."""
+        self.flush()
+        if self._conn is not None and self._pid == os.getpid():
+            self._conn.close()
+        self._conn = None
+
+    def __len__(self) -> int:
+        self.flush()
+        row = self._connection().execute("SELECT COUNT(*) FROM emptiness").fetchone()
+        return int(row[0])
+
+    def stats(self) -> Dict[str, float]:
+        """Return the hits, misses, hit rate and maxsize of the cache."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "maxsize": self.maxsize,
+        }
+
+
+class EmptinessChecker:
+    """
+    Decide if a tiling is empty.
+
+    A number of cheap certificates, each linear in the number of obstructions
+    and requirements, are tried in order before falling back to the witness
+    search of MinimalGriddedPerms. The layer that decided each tiling is
+    counted, and the counts are returned by the stats method.
+
+    If a cache is enabled with enable_cache, it is looked up after the cheap
+    certificates and the results of the initial and search layers are added
+    to it.
+    """
+
+    LAYERS = (
+        "obstruction",
+        "requirement",
+        "single",
+        "pair",
+        "cache",
+        "initial",
+        "search",
+    )
+    _hits: Counter = Counter()
+    _cache: Optional[EmptinessCache] = None
+
+    def __init__(self, tiling: "Tiling"):
+        self._tiling = tiling
+        self._layer: Optional[str] = None
+        self._empty: Optional[bool] = None
+
+    @classmethod
+    def stats(cls) -> Dict[str, int]:
+        """Return the number of tilings decided by each layer."""
+        return {layer: cls._hits[layer] for layer in cls.LAYERS}
+
+    @classmethod
+    def reset_stats(cls) -> None:
+        """Set the counts of every layer back to zero."""
+        cls._hits.clear()
+
+    @classmethod
+    def enable_cache(cls, cache_dir: str, maxsize: int = 1000000) -> None:
+        """Store the emptiness results in a database in cache_dir, and use
+        the results already in it."""
+        cls.disable_cache()
+        cls._cache = EmptinessCache(cache_dir, maxsize)
+        atexit.register(cls._cache.close)
+
+    @classmethod
+    def disable_cache(cls) -> None:
+        """Write the pending results of the cache and stop using it."""
+        if cls._cache is not None:
+            cls._cache.close()
+            atexit.unregister(cls._cache.close)
+            cls._cache = None
+
+    @classmethod
+    def cache(cls) -> Optional[EmptinessCache]:
+        """Return the cache, or None if it is not enabled."""
+        return cls._cache
+
+    @property
+    def layer(self) -> str:
+        """The name of the layer that decided the tiling."""
+        self.is_empty()
+        assert self._layer is not None
+        return self._layer
+
+    def is_empty(self) -> bool:
+        """Return True if no gridded perm can be gridded on the tiling."""
+        if self._empty is None:
+            self._layer, self._empty = self._decide()
+            EmptinessChecker._hits[self._layer] += 1
+        return self._empty
+
+    def _decide(self) -> Tuple[str, bool]:
+        if any(ob.is_empty() for ob in self._tiling.obstructions):
+            return "obstruction", True
+        if self._requirement_in_empty_cells():
+            return "requirement", True
+        if len(self._tiling.requirements) <= 1:
+            return "single", False
+        if self._positive_cells_contradict():
+            return "pair", True
+        cache = EmptinessChecker._cache
+        if cache is None:
+            return self._search()
+        key = self._tiling.to_bytes()
+        empty = cache.get(key)
+        if empty is not None:
+            return "cache", empty
+        layer, empty = self._search()
+        cache[key] = empty
+        return layer, empty
+
+    def _search(self) -> Tuple[str, bool]:
+        mgp = MinimalGriddedPerms(self._tiling)
+        if self._initial_gp_is_witness(mgp):
+            return "initial", False
+        return "search", mgp.witness() is None
+
+    def _empty_cells(self) -> FrozenSet[Cell]:
+        """Return the cells with a point obstruction."""
+        return frozenset(
+            ob.pos[0] for ob in self._tiling.obstructions if ob.is_point_perm()
+        )
+
+    def _requirement_in_empty_cells(self) -> bool:
+        """Return True if every gridded perm of some requirement list has a
+        point in a cell with a point obstruction."""
+        empty_cells = self._empty_cells()
+        if not empty_cells:
+            return False
+        return any(
+            all(any(cell in empty_cells for cell in gp.pos) for gp in reqs)
+            for reqs in self._tiling.requirements
+        )
+
+    def _positive_cells_contradict(self) -> bool:
+        """Return True if two positive cells can not both contain a point,
+        that is every way of placing a point in each of them is an
+        obstruction."""
+        length2_obs = frozenset(ob for ob in self._tiling.obstructions if len(ob) == 2)
+        if not length2_obs:
+            return False
+        for c1, c2 in combinations(sorted(self._tiling.positive_cells), 2):
+            pairs = (
+                GriddedPerm(Perm(patt), pos)
+                for patt in ((0, 1), (1, 0))
+                for pos in ((c1, c2), (c2, c1))
+            )
+            if all(gp in length2_obs for gp in pairs if not gp.contradictory()):
+                return True
+        return False
+
+    def _initial_gp_is_witness(self, mgp: MinimalGriddedPerms) -> bool:
+        """Return True if the initial gridded perm of the shortest gridded perm
+        in each requirement list is on the tiling."""
+        gps = tuple(min(reqs, key=len) for reqs in self._tiling.requirements)
+        initial_gp = mgp.initial_gp(*gps)
+        if not mgp.satisfies_obstructions(initial_gp):
+            return False
+        return mgp.satisfies_requirements(initial_gp)
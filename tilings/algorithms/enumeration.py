@@ -244,7 +244,7 @@ class MonotoneTreeEnumeration(Enumeration):
         # A simple test to warn us if the code is wrong
         if __debug__:
             lhs = taylor_expand(F, n=6)
-            rhs = [len(list(self.tiling.objects_of_size(i))) for i in range(7)]
+            rhs = self.tiling.count_gridded_perms(6)
         assert lhs == rhs, f"Bad genf\n{lhs}\n{rhs}"
         return F
 
@@ -353,7 +353,8 @@ class DatabaseEnumeration(Enumeration):
         Retrieve the tiling entry from the database. Returns None if the tiling
         is not in the database.
         """
-        key = self.tiling.to_bytes().hex()
+        # The keys of the database are in version 1 of the bytes format.
+        key = self.tiling.to_bytes(version=1).hex()
         search_url = DatabaseEnumeration.API_ROOT_URL + "verified_tiling/key/{}".format(
             key
         )
@@ -372,7 +373,10 @@ class DatabaseEnumeration(Enumeration):
         """
         DatabaseEnumeration.num_verified_request += 1
         if DatabaseEnumeration.all_verified_tilings:
-            return self.tiling.to_bytes() in DatabaseEnumeration.all_verified_tilings
+            return (
+                self.tiling.to_bytes(version=1)
+                in DatabaseEnumeration.all_verified_tilings
+            )
         if DatabaseEnumeration.num_verified_request > 100:
             DatabaseEnumeration.load_verified_tiling()
         return self._get_tiling_entry() is not None
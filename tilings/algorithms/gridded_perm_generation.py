@@ -1,9 +1,17 @@
-from collections import Counter
+import random
+from collections import Counter, defaultdict, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import chain
+from operator import add
 from typing import (
     TYPE_CHECKING,
+    Deque,
     Dict,
+    FrozenSet,
+    Hashable,
     Iterable,
     Iterator,
+    List,
     Optional,
     Sequence,
     Set,
@@ -11,12 +19,20 @@ from typing import (
 )
 
 from permuta import Perm
+from tilings.assumptions import TrackingAssumption
 from tilings.griddedperm import GriddedPerm
 
 if TYPE_CHECKING:
     from tilings import Tiling
 
 Cell = Tuple[int, int]
+Reqs = Sequence[Sequence[GriddedPerm]]
+State = Tuple[GriddedPerm, int, Reqs, bool]
+Values = Tuple[int, ...]
+Tracker = Tuple[Tuple[GriddedPerm, ...], Optional[FrozenSet[Cell]], int]
+
+# The search each worker process last used, see _worker_search.
+_WORKER_SEARCH: Dict[Tuple["Tiling", int], "GriddedPermsOnTiling"] = {}
 
 
 class GriddedPermsOnTiling:
@@ -26,12 +42,24 @@ class GriddedPermsOnTiling:
     The gridded permutations are up to length of the longest minimum
     gridded permutations that is griddable on the tiling unless maxlen is
     specified.
+
+    If processes is more than 1, the search tree is split into subtrees that
+    are searched in that many worker processes.
     """
 
-    def __init__(self, tiling: "Tiling", maxlen: Optional[int] = None):
+    def __init__(
+        self,
+        tiling: "Tiling",
+        maxlen: Optional[int] = None,
+        processes: Optional[int] = None,
+    ):
+        self._tiling = tiling
+        self._processes = processes
         self._active_cells = tiling.active_cells
         self._obstructions = tiling.obstructions
+        self._obstruction_index = tiling.obstruction_index
         self._requirements = tiling.requirements
+        self._assumptions = tiling.assumptions
         self._num_columns = tiling.dimensions[0]
         self._maxlen = (
             maxlen
@@ -39,6 +67,12 @@ class GriddedPermsOnTiling:
             else max(tiling.maximum_length_of_minimum_gridded_perm(), 1)
         )
         self._cell_counts = self.min_cell_counts()
+        self._prefixes = self.requirement_prefixes()
+        self._count_cache: Dict[Hashable, List[int]] = {}
+        self._unlinked_cells_cache: Dict[Tuple[int, Reqs], FrozenSet[Cell]] = {}
+        self._unlinked_by_obs: Dict[int, FrozenSet[Cell]] = {}
+        # Set when sampling, so that the counts of every state are kept.
+        self._cache_all_counts = False
 
     def patts_contained_in_cell(self, cell: Cell) -> Set[Perm]:
         """
@@ -69,6 +103,25 @@ class GriddedPermsOnTiling:
             res[cell] = points_in_cell
         return res
 
+    def requirement_prefixes(self) -> Dict[GriddedPerm, Tuple[GriddedPerm, ...]]:
+        """
+        Map each requirement to the tuple of its subperms left of each column,
+        from column 0 to the number of columns.
+
+        A subperm is the same object as the one before it if the requirement
+        has no points in the column between them.
+        """
+        res: Dict[GriddedPerm, Tuple[GriddedPerm, ...]] = {}
+        for req in chain.from_iterable(self._requirements):
+            prefixes = [req.get_subperm_left_col(0)]
+            for col in range(1, self._num_columns + 1):
+                if any(cell[0] == col - 1 for cell in req.pos):
+                    prefixes.append(req.get_subperm_left_col(col))
+                else:
+                    prefixes.append(prefixes[-1])
+            res[req] = tuple(prefixes)
+        return res
+
     def can_satisfy_cell_counts(self, gp: GriddedPerm) -> bool:
         """
         Determine if the given gridded permutation can satisfy the lower bound
@@ -104,20 +157,59 @@ class GriddedPermsOnTiling:
             any(self.can_satisfy(gp, col, req) for req in reqlist) for reqlist in reqs
         )
 
-    @staticmethod
-    def can_satisfy(gp: GriddedPerm, col: int, req: GriddedPerm) -> bool:
-        return req.get_subperm_left_col(col) in gp
+    def can_satisfy(self, gp: GriddedPerm, col: int, req: GriddedPerm) -> bool:
+        return self._prefixes[req][col] in gp
 
     @staticmethod
     def satisfies(gp: GriddedPerm, reqlist: Iterable[GriddedPerm]) -> bool:
         return any(req in gp for req in reqlist)
 
-    def forbidden(self, gp: GriddedPerm) -> bool:
+    def satisfiable_reqs(self, gp: GriddedPerm, col: int, reqs: Reqs) -> Optional[Reqs]:
+        """
+        Return the requirement lists with only the requirements whose part
+        left of col is in gp, or None if one of the lists would be empty.
+
+        The part of each requirement left of col - 1 must be in gp. Only the
+        requirements with a point in column col - 1 are checked again.
+        """
+        res = []
+        for reqlist in reqs:
+            satisfiable = tuple(
+                req
+                for req in reqlist
+                if self._prefixes[req][col] is self._prefixes[req][col - 1]
+                or self._prefixes[req][col] in gp
+            )
+            if not satisfiable:
+                return None
+            res.append(satisfiable)
+        return tuple(res)
+
+    @staticmethod
+    def unsatisfied_reqs(gp: GriddedPerm, reqs: Reqs) -> Reqs:
+        """
+        Return the requirement lists that gp does not satisfy, given that gp
+        with its last point removed does not satisfy any of them.
+        """
+        index = len(gp) - 1
+        return tuple(
+            reqlist
+            for reqlist in reqs
+            if not any(req.occurs_in_using_point(gp, index) for req in reqlist)
+        )
+
+    def forbidden(self, gp: GriddedPerm, index: Optional[int] = None) -> bool:
         """
         Determine if the gridded contains one of the obstructions of the
         tiling.
+
+        If index is given, the gridded perm with the point at index removed is
+        assumed to avoid the obstructions, so only occurrences using that point
+        are checked.
         """
-        return any(ob in gp for ob in self._obstructions)
+        if index is None:
+            return self._obstruction_index.contains(gp)
+        return self._obstruction_index.contains_using_point(gp, index)
 
     def backtracking(
         self,
@@ -131,7 +223,8 @@ class GriddedPermsOnTiling:
 
         INPUT:
         - `curgp`: The current gridded permutation under consideration
-        - `reqs`: Iterable of unsatisfied list requirements
+        - `reqs`: Iterable of unsatisfied list requirements, with only the
+          requirements whose part left of curcol is in curgp
         - `yielded`: True if the permutation has already been yielded.
         """
         # If all requirements have been satisfied, then yield
@@ -141,30 +234,540 @@ class GriddedPermsOnTiling:
         # If maximum length reached, then bail
         if len(curgp) >= self._maxlen or curcol >= self._num_columns:
             return
-        # Prune away unsatisfiable requirements and remove lists that have
-        # already been satisfied
-        satisfiable = tuple(
-            tuple(r for r in reqlist if self.can_satisfy(curgp, curcol, r))
-            for reqlist in reqs
-        )
-        if any(not reqlist for reqlist in satisfiable):
-            return
 
         if not self.can_satisfy_cell_counts(curgp):
             return
 
-        if self.can_satisfy_all(curgp, curcol + 1, satisfiable):
+        # Points are no longer placed in curcol, so prune away the
+        # requirements that can not be satisfied from the next column.
+        satisfiable = self.satisfiable_reqs(curgp, curcol + 1, reqs)
+        if satisfiable is not None:
             yield from self.backtracking(curgp, curcol + 1, satisfiable, yielded)
 
         for nextgp in self.insert_next_point(curgp, curcol):
-            if not self.forbidden(nextgp):
-                unsatisfied_reqs = tuple(
-                    reqlist for reqlist in reqs if not self.satisfies(nextgp, reqlist)
-                )
+            if not self.forbidden(nextgp, len(curgp)):
+                unsatisfied_reqs = self.unsatisfied_reqs(nextgp, reqs)
                 yield from self.backtracking(nextgp, curcol, unsatisfied_reqs)
 
+    def gridded_perms_by_length(self) -> Iterator[List[GriddedPerm]]:
+        """
+        Yield the list of gridded permutations of each length from 0 to
+        maxlen.
+
+        The gridded perms of length n are built from the gridded perms of
+        length n - 1 that avoid the obstructions and could still be extended
+        to contain the requirements, by appending a point after the last
+        point. Only those of the previous length are kept, together with the
+        requirement lists they do not satisfy yet.
+        """
+        if GriddedPerm.empty_perm() in self._obstructions:
+            for _ in range(self._maxlen + 1):
+                yield []
+            return
+        layer: List[Tuple[GriddedPerm, Reqs]] = [
+            (GriddedPerm.empty_perm(), tuple(self._requirements))
+        ]
+        for length in range(self._maxlen + 1):
+            yield [gp for gp, reqs in layer if not reqs]
+            if length < self._maxlen:
+                layer = [
+                    extension
+                    for gp, reqs in layer
+                    for extension in self._next_layer_extensions(gp, reqs)
+                ]
+
+    def _next_layer_extensions(
+        self, gp: GriddedPerm, reqs: Reqs
+    ) -> Iterator[Tuple[GriddedPerm, Reqs]]:
+        """
+        Yield the gridded perms with a point appended to gp that avoid the
+        obstructions and could still be extended to contain the requirements,
+        together with the requirement lists in reqs they do not satisfy.
+        """
+        startcol = gp.pos[-1][0] if gp else 0
+        for col in range(startcol, self._num_columns):
+            # The parts of the requirements left of startcol are already
+            # checked to be in gp.
+            if col > startcol:
+                satisfiable = self.satisfiable_reqs(gp, col, reqs)
+                if satisfiable is None:
+                    return
+                reqs = satisfiable
+            for nextgp in self.insert_next_point(gp, col):
+                if self.forbidden(nextgp, len(gp)):
+                    continue
+                unsatisfied_reqs = self.unsatisfied_reqs(nextgp, reqs)
+                if self.can_satisfy_cell_counts(nextgp):
+                    yield nextgp, unsatisfied_reqs
+
+    def count_by_length(self) -> List[int]:
+        """
+        Return the number of gridded permutations of each length up to maxlen,
+        without keeping the gridded permutations.
+
+        This is the same search as the backtracking, but the number of
+        completions of a state is cached for the states that are equivalent
+        to other states, see _count_key.
+        """
+        if GriddedPerm.empty_perm() in self._obstructions:
+            return [0] * (self._maxlen + 1)
+        if self._processes is not None and self._processes > 1:
+            return self._parallel_count_by_length(self._processes)
+        return self.count_states(
+            [(GriddedPerm.empty_perm(), 0, self._requirements, False)]
+        )
+
+    def count_states(self, states: Iterable[State]) -> List[int]:
+        """
+        Return the number of gridded permutations of each length that the
+        backtracking yields from the given states.
+        """
+        res = [0] * (self._maxlen + 1)
+        try:
+            for state in states:
+                res = list(map(add, res, self._count(*state)))
+            return res
+        finally:
+            self._count_cache.clear()
+            self._unlinked_cells_cache.clear()
+            self._unlinked_by_obs.clear()
+
+    @staticmethod
+    def _cells_linked_by(gps: Iterable[GriddedPerm], col: int) -> Set[Cell]:
+        """
+        The cells left of col that share one of the gridded perms with a cell
+        in col or to the right of it.
+        """
+        cells: Set[Cell] = set()
+        for gp in gps:
+            if gp.pos and gp.pos[-1][0] >= col:
+                cells.update(cell for cell in gp.pos if cell[0] < col)
+        return cells
+
+    def _unlinked_cells(self, col: int, reqs: Reqs) -> FrozenSet[Cell]:
+        """
+        The active cells left of col that share no obstruction and no
+        requirement in reqs with a cell in col or to the right of it.
+        """
+        unlinked = self._unlinked_by_obs.get(col)
+        if unlinked is None:
+            linked = self._cells_linked_by(self._obstructions, col)
+            unlinked = frozenset(
+                cell
+                for cell in self._active_cells
+                if cell[0] < col and cell not in linked
+            )
+            self._unlinked_by_obs[col] = unlinked
+        if not unlinked or not reqs:
+            return unlinked
+        key = (col, reqs)
+        res = self._unlinked_cells_cache.get(key)
+        if res is None:
+            res = unlinked.difference(
+                self._cells_linked_by(chain.from_iterable(reqs), col)
+            )
+            self._unlinked_cells_cache[key] = res
+        return res
+
+    def _count_key(
+        self, gp: GriddedPerm, col: int, reqs: Reqs, counted: bool
+    ) -> Optional[Hashable]:
+        """
+        Return a key such that states with the same key have the same number
+        of completions of each length, or None if the state is only equivalent
+        to itself.
+
+        No more points are placed left of col. A point there in a cell that is
+        not linked to col or beyond can not be in an occurrence with a later
+        point, so the later points only see how many such points there are
+        between the other points of its row. These points are dropped from the
+        key, which keeps the number of them in each gap of each row.
+        """
+        if col == 0:
+            return None
+        pos = gp.pos
+        if self._unlinked_cells(col, ()).isdisjoint(pos):
+            return None
+        unlinked = self._unlinked_cells(col, reqs)
+        dropped = [cell in unlinked for cell in pos]
+        if not any(dropped):
+            return None
+        patt = gp.patt
+        rows: Dict[int, List[Tuple[int, bool]]] = defaultdict(list)
+        for val, cell, drop in zip(patt, pos, dropped):
+            rows[cell[1]].append((val, drop))
+        gaps = []
+        for row, points in sorted(rows.items()):
+            if any(drop for _, drop in points):
+                counts = [0]
+                for _, drop in sorted(points):
+                    if drop:
+                        counts[-1] += 1
+                    else:
+                        counts.append(0)
+                gaps.append((row, tuple(counts)))
+        points_in_cells = Counter(pos)
+        missing_left = sum(
+            max(0, self._cell_counts[cell] - points_in_cells[cell])
+            for cell in self._active_cells
+            if cell[0] < col
+        )
+        kept = [idx for idx, drop in enumerate(dropped) if not drop]
+        return (
+            Perm.to_standard(patt[idx] for idx in kept),
+            tuple(pos[idx] for idx in kept),
+            tuple(gaps),
+            missing_left,
+            col,
+            reqs,
+            counted,
+        )
+
+    def _count(
+        self, curgp: GriddedPerm, curcol: int, reqs: Reqs, counted: bool
+    ) -> List[int]:
+        """
+        Return the number of gridded permutations of each length that the
+        backtracking yields from the given state.
+        """
+        # Only the states with at least two points to go are worth caching.
+        key = (
+            self._count_key(curgp, curcol, reqs, counted)
+            if len(curgp) + 1 < self._maxlen
+            else None
+        )
+        if key is None and self._cache_all_counts:
+            key = (curgp, curcol, reqs, counted)
+        if key is not None and key in self._count_cache:
+            return self._count_cache[key]
+        res = [0] * (self._maxlen + 1)
+        if not reqs and not counted:
+            res[len(curgp)] += 1
+            counted = True
+        if len(curgp) < self._maxlen and curcol < self._num_columns:
+            if self.can_satisfy_cell_counts(curgp):
+                satisfiable = self.satisfiable_reqs(curgp, curcol + 1, reqs)
+                if satisfiable is not None:
+                    counts = self._count(curgp, curcol + 1, satisfiable, counted)
+                    res = list(map(add, res, counts))
+                last_point = len(curgp) + 1 == self._maxlen
+                for nextgp in self.insert_next_point(curgp, curcol):
+                    if self.forbidden(nextgp, len(curgp)):
+                        continue
+                    if last_point:
+                        # The gridded perms of length maxlen are counted here
+                        # instead of in a call for each.
+                        if not self.unsatisfied_reqs(nextgp, reqs):
+                            res[self._maxlen] += 1
+                        continue
+                    unsatisfied_reqs = self.unsatisfied_reqs(nextgp, reqs)
+                    counts = self._count(nextgp, curcol, unsatisfied_reqs, False)
+                    res = list(map(add, res, counts))
+        if key is not None:
+            self._count_cache[key] = res
+        return res
+
+    def _children(
+        self, curgp: GriddedPerm, curcol: int, reqs: Reqs, yielded: bool
+    ) -> Iterator[State]:
+        """
+        Yield the states the backtracking moves to from the given state, where
+        yielded is True if curgp is yielded at the state or before it.
+        """
+        if (
+            len(curgp) >= self._maxlen
+            or curcol >= self._num_columns
+            or not self.can_satisfy_cell_counts(curgp)
+        ):
+            return
+        satisfiable = self.satisfiable_reqs(curgp, curcol + 1, reqs)
+        if satisfiable is not None:
+            yield (curgp, curcol + 1, satisfiable, yielded)
+        for nextgp in self.insert_next_point(curgp, curcol):
+            if not self.forbidden(nextgp, len(curgp)):
+                yield (nextgp, curcol, self.unsatisfied_reqs(nextgp, reqs), False)
+
+    def random_gridded_perm(
+        self, rng: Optional[random.Random] = None
+    ) -> Optional[GriddedPerm]:
+        """
+        Return a uniformly random gridded permutation of length maxlen, or None
+        if there are none.
+
+        Starting from the root of the backtracking, the next state is chosen
+        with probability proportional to the number of gridded perms of length
+        maxlen below it, as counted by _count. The counts of all the states are
+        kept, so later samples only look them up.
+        """
+        randrange = random.randrange if rng is None else rng.randrange
+        if GriddedPerm.empty_perm() in self._obstructions:
+            return None
+        self._cache_all_counts = True
+        state: State = (GriddedPerm.empty_perm(), 0, self._requirements, False)
+        total = self._count(*state)[self._maxlen]
+        if total == 0:
+            return None
+        # The index of the sample among the gridded perms below the state.
+        target = randrange(total)
+        while True:
+            curgp, curcol, reqs, counted = state
+            if not reqs and not counted:
+                if len(curgp) == self._maxlen:
+                    return curgp
+                counted = True
+            for child in self._children(curgp, curcol, reqs, counted):
+                weight = self._count(*child)[self._maxlen]
+                if target < weight:
+                    state = child
+                    break
+                target -= weight
+
+    def random_gridded_perms(
+        self, size: int, rng: Optional[random.Random] = None
+    ) -> List[GriddedPerm]:
+        """
+        Return size independent uniformly random gridded permutations of
+        length maxlen, or an empty list if there are none.
+        """
+        res = []
+        for _ in range(size):
+            gp = self.random_gridded_perm(rng)
+            if gp is None:
+                break
+            res.append(gp)
+        return res
+
+    def gridded_perms_with_values(
+        self, values: Optional[Dict[TrackingAssumption, int]] = None
+    ) -> Iterator[Tuple[GriddedPerm, Values]]:
+        """
+        Yield the gridded permutations of length maxlen together with the
+        tuple of the values of the assumptions of the tiling on them.
+
+        If values is given, only the gridded perms on which each assumption in
+        it takes the given value are yielded.
+
+        The number of occurrences of the gridded perms of a tracking assumption
+        is updated with the occurrences using each inserted point. It can only
+        grow, it grows by at most one with each point if the gridded perms are
+        points, and it is fixed once the search is right of all of its cells,
+        so branches that can no longer reach the value are pruned. The values
+        of other assumptions, like the component assumptions, are computed for
+        each gridded perm at the end.
+        """
+        if GriddedPerm.empty_perm() in self._obstructions:
+            return
+        trackers = tuple(self._tracker(ass) for ass in self._assumptions)
+        targets = tuple((values or {}).get(ass) for ass in self._assumptions)
+        state: State = (GriddedPerm.empty_perm(), 0, self._requirements, False)
+        start = (0,) * len(self._assumptions)
+        for gp, partial in self._values_search(state, start, trackers, targets):
+            res = tuple(
+                val if tracker is not None else ass.get_value(gp)
+                for val, tracker, ass in zip(partial, trackers, self._assumptions)
+            )
+            if all(t is None or t == val for t, val in zip(targets, res)):
+                yield gp, res
+
+    @staticmethod
+    def _tracker(ass: TrackingAssumption) -> Optional[Tracker]:
+        """
+        Return how the value of the assumption is updated when a point is
+        inserted, or None if it is computed at the end.
+
+        It is the tuple of the tracked gridded perms, the frozenset of their
+        cells if they are all points, and the rightmost column of the cells.
+        """
+        if type(ass).get_value is not TrackingAssumption.get_value:
+            return None
+        cells = frozenset(chain.from_iterable(gp.pos for gp in ass.gps))
+        points = cells if all(len(gp) == 1 for gp in ass.gps) else None
+        return ass.gps, points, max((cell[0] for cell in cells), default=-1)
+
+    def _values_search(
+        self,
+        state: State,
+        values: Values,
+        trackers: Tuple[Optional[Tracker], ...],
+        targets: Tuple[Optional[int], ...],
+    ) -> Iterator[Tuple[GriddedPerm, Values]]:
+        """
+        The backtracking from the state, keeping the values of the assumptions
+        with a tracker on the gridded perm of the state.
+        """
+        curgp, curcol, reqs, yielded = state
+        if not reqs and not yielded:
+            if len(curgp) == self._maxlen:
+                yield curgp, values
+            yielded = True
+        for child in self._children(curgp, curcol, reqs, yielded):
+            nextgp, nextcol = child[0], child[1]
+            nextvalues = values
+            if nextgp is not curgp:
+                nextvalues = tuple(
+                    val + self._value_increase(tracker, nextgp)
+                    if tracker is not None
+                    else val
+                    for val, tracker in zip(values, trackers)
+                )
+            remaining = self._maxlen - len(nextgp)
+            if all(
+                target is None
+                or tracker is None
+                or val == target
+                or (
+                    val < target
+                    and tracker[2] >= nextcol
+                    and (tracker[1] is None or target - val <= remaining)
+                )
+                for val, tracker, target in zip(nextvalues, trackers, targets)
+            ):
+                yield from self._values_search(child, nextvalues, trackers, targets)
+
+    @staticmethod
+    def _value_increase(tracker: Tracker, gp: GriddedPerm) -> int:
+        """
+        Return the number of occurrences of the tracked gridded perms in gp
+        that use its last point.
+        """
+        patts, points, _ = tracker
+        if points is not None:
+            return 1 if gp.pos[-1] in points else 0
+        index = len(gp) - 1
+        return sum(
+            1 for patt in patts for _ in patt.occurrences_in_using_point(gp, index)
+        )
+
+    def count_by_values(self) -> Dict[Values, int]:
+        """
+        Return the number of gridded permutations of length maxlen with each
+        tuple of values of the assumptions of the tiling.
+        """
+        return dict(Counter(values for _, values in self.gridded_perms_with_values()))
+
+    def frontier(self, depth: int) -> List[State]:
+        """
+        Return the states of the backtracking at which a gridded perm of the
+        given length is first reached, in the order the backtracking reaches
+        them.
+
+        The gridded perms the backtracking yields before that are returned as
+        the states (gp, number of columns, (), False), from which the
+        backtracking only yields gp. The backtracking from each of the states
+        together yield all the gridded perms, in the same order.
+        """
+        res: List[State] = []
+
+        def expand(curgp: GriddedPerm, curcol: int, reqs: Reqs, yielded: bool):
+            if len(curgp) >= depth:
+                res.append((curgp, curcol, reqs, yielded))
+                return
+            if not reqs and not yielded:
+                res.append((curgp, self._num_columns, (), False))
+                yielded = True
+            for child in self._children(curgp, curcol, reqs, yielded):
+                expand(*child)
+
+        if GriddedPerm.empty_perm() not in self._obstructions:
+            expand(GriddedPerm.empty_perm(), 0, self._requirements, False)
+        return res
+
+    def _split(self, processes: int) -> List[List[State]]:
+        """
+        Split the search into batches of states for the worker processes.
+
+        The search is split at the smallest depth with at least eight states
+        for each process, and the states are grouped into about four batches
+        for each process.
+        """
+        depth = 1
+        states = self.frontier(depth)
+        while len(states) < 8 * processes and depth < self._maxlen:
+            depth += 1
+            states = self.frontier(depth)
+        size = max(1, len(states) // (4 * processes))
+        return [states[i : i + size] for i in range(0, len(states), size)]
+
+    def _parallel_iter(self, processes: int) -> Iterator[GriddedPerm]:
+        """
+        Yield the gridded perms by searching batches of states in worker
+        processes, in the same order as the backtracking.
+
+        At most two batches for each process are submitted ahead of the batch
+        being yielded, which bounds the number of gridded perms held. The
+        batches are sent back as bytes, see _worker_gridded_perms.
+        """
+        batches = deque(self._split(processes))
+        pending: Deque[Future] = deque()
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            while batches or pending:
+                while batches and len(pending) < 2 * processes:
+                    pending.append(
+                        executor.submit(
+                            _worker_gridded_perms,
+                            self._tiling,
+                            self._maxlen,
+                            batches.popleft(),
+                        )
+                    )
+                data = pending.popleft().result()
+                view, offset = memoryview(data), 0
+                while offset < len(data):
+                    gp, offset = GriddedPerm.read_bytes(view, offset)
+                    yield gp
+
+    def _parallel_count_by_length(self, processes: int) -> List[int]:
+        """
+        Return the number of gridded perms of each length by counting batches
+        of states in worker processes.
+        """
+        res = [0] * (self._maxlen + 1)
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            futures = [
+                executor.submit(_worker_count, self._tiling, self._maxlen, batch)
+                for batch in self._split(processes)
+            ]
+            for future in futures:
+                res = list(map(add, res, future.result()))
+        return res
+
     def __iter__(self) -> Iterator[GriddedPerm]:
         if not GriddedPerm(Perm(tuple()), tuple()) in self._obstructions:
+            if self._processes is not None and self._processes > 1:
+                yield from self._parallel_iter(self._processes)
+                return
             yield from self.backtracking(
                 GriddedPerm.empty_perm(), 0, self._requirements
             )
+
+
+def _worker_search(tiling: "Tiling", maxlen: int) -> GriddedPermsOnTiling:
+    """
+    Return the search for the tiling in a worker process. The search is kept
+    for the next batch, which is usually for the same tiling.
+    """
+    key = (tiling, maxlen)
+    search = _WORKER_SEARCH.get(key)
+    if search is None:
+        _WORKER_SEARCH.clear()
+        search = GriddedPermsOnTiling(tiling, maxlen)
+        _WORKER_SEARCH[key] = search
+    return search
+
+
+def _worker_gridded_perms(tiling: "Tiling", maxlen: int, states: List[State]) -> bytes:
+    """
+    Return the gridded perms the backtracking yields from the states, written
+    one after another with GriddedPerm.write_bytes, which is about twice as
+    fast to send back as pickling the list.
+    """
+    search = _worker_search(tiling, maxlen)
+    buf = bytearray()
+    for state in states:
+        for gp in search.backtracking(*state):
+            gp.write_bytes(buf)
+    return bytes(buf)
+
+
+def _worker_count(tiling: "Tiling", maxlen: int, states: List[State]) -> List[int]:
+    return _worker_search(tiling, maxlen).count_states(states)
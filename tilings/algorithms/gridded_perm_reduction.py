@@ -1,9 +1,14 @@
 from collections import defaultdict
 from functools import partial
-from itertools import chain, islice
+from itertools import chain, combinations, islice
+from math import factorial
 from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
 
+from permuta import Perm
+
 from ..griddedperm import GriddedPerm
+from ..misc import intersection_reduce, union_reduce
+from .obstruction_index import ObstructionIndex
 
 Cell = Tuple[int, int]
 Requirement = Tuple[GriddedPerm, ...]
@@ -96,7 +101,15 @@ class GriddedPermReduction:
         )
         changed = []
         unchanged = []
+        # A factor can only be implied by a requirement if all of its cells are
+        # used by every gridded perm in the requirement.
+        implied_cells = union_reduce(
+            intersection_reduce(gp.pos for gp in req) for req in self._requirements
+        )
         for ob in min_perms:
+            if implied_cells.isdisjoint(ob.pos):
+                unchanged.append(ob)
+                continue
             cleaned_perm = self._clean_isolated(ob)
             if cleaned_perm == ob:
                 unchanged.append(cleaned_perm)
@@ -105,8 +118,9 @@ class GriddedPermReduction:
         if not changed:
             return tuple(unchanged)
 
+        changed_index = ObstructionIndex(changed)
         return GriddedPermReduction._minimize(changed) + tuple(
-            [gp for gp in unchanged if gp.avoids(*changed)]
+            [gp for gp in unchanged if changed_index.avoids(gp)]
         )
 
     def minimal_reqs(
@@ -207,6 +221,7 @@ class GriddedPermReduction:
     ) -> List[Requirement]:
         if obstructions is None:
             obstructions = self._obstructions
+        obstruction_index = ObstructionIndex(obstructions)
         res: List[Requirement] = []
         for requirement in requirements:
             # If any gridded permutation in list is empty then you vacuously
@@ -216,7 +231,7 @@ class GriddedPermReduction:
             cleanreq = tuple(
                 gp
                 for gp in GriddedPermReduction._minimize(requirement)
-                if gp.avoids(*obstructions)
+                if obstruction_index.avoids(gp)
             )
             # If cleanreq is empty, then can not contain this requirement so
             # the tiling is empty.
@@ -268,14 +283,55 @@ class GriddedPermReduction:
         if not sizes:
             return tuple()
         minimal_perms = set(perms_by_size[sizes[0]])
-        for size in sizes[1:]:
-            next_layer = set()
-            for gp in perms_by_size[size]:
-                if gp.avoids(*minimal_perms):
-                    next_layer.add(gp)
+        # The minimal perms found so far, grouped by their cell counts, so that
+        # each gp is only checked against those that could be contained in it.
+        # It is only built once it is needed.
+        index: Optional[ObstructionIndex] = None
+        for i, size in enumerate(sizes[1:], start=1):
+            smaller_sizes = sizes[:i]
+            num_subperms = sum(
+                factorial(size) // (factorial(k) * factorial(size - k))
+                for k in smaller_sizes
+            )
+            # If there are fewer subperms than minimal perms, it is faster to
+            # look up each subperm in the set of minimal perms.
+            if num_subperms < len(minimal_perms):
+                next_layer = set(
+                    gp
+                    for gp in perms_by_size[size]
+                    if not GriddedPermReduction._has_subperm_in(
+                        gp, smaller_sizes, minimal_perms
+                    )
+                )
+            else:
+                if index is None:
+                    index = ObstructionIndex(minimal_perms)
+                next_layer = set(gp for gp in perms_by_size[size] if index.avoids(gp))
+            if index is not None:
+                for gp in next_layer:
+                    index.add(gp)
             minimal_perms |= next_layer
         return tuple(minimal_perms)
 
+    @staticmethod
+    def _has_subperm_in(
+        gp: GriddedPerm, sizes: Iterable[int], griddedperms: Set[GriddedPerm]
+    ) -> bool:
+        """
+        Return True if a subgridded perm of gp with length in sizes is one of
+        the griddedperms.
+        """
+        patt, pos = gp.patt, gp.pos
+        for size in sizes:
+            for indices in combinations(range(len(gp)), size):
+                subgp = GriddedPerm(
+                    Perm.to_standard([patt[i] for i in indices]),
+                    [pos[i] for i in indices],
+                )
+                if subgp in griddedperms:
+                    return True
+        return False
+
     @staticmethod
     def factors(griddedperms: Tuple[GriddedPerm, ...]) -> Set[GriddedPerm]:
         res: Set[GriddedPerm] = set(griddedperms[0].factors())
@@ -1,24 +1,40 @@
-from collections import Counter, defaultdict
-from heapq import heapify, heappop, heappush
+from collections import Counter, defaultdict, deque
+from concurrent.futures import Executor
+from heapq import heapify, heappop, heappush, merge
 from itertools import chain, product
-from typing import TYPE_CHECKING, Dict, FrozenSet, Iterator, List, Optional, Set, Tuple
+from typing import (
+    TYPE_CHECKING,
+    Deque,
+    Dict,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
 
 from permuta import Perm
 from tilings import GriddedPerm
+from tilings.misc import LRUCache
 
 if TYPE_CHECKING:
     from tilings import Tiling
 
+    from .better_bounds import BetterBounds
 
-__all__ = ["MinimalGriddedPerms"]
+
+__all__ = ["MinimalGriddedPerms", "TargetTables"]
 
 Cell = Tuple[int, int]
 GPTuple = Tuple[GriddedPerm, ...]
 Reqs = Tuple[GPTuple, ...]
-WorkPackets = Tuple[GriddedPerm, GPTuple, Cell]
 
 
 class QueuePacket:
+    __slots__ = ("gp", "gps", "last_cell", "still_localising", "mindices")
+
     def __init__(
         self,
         gp: GriddedPerm,
@@ -37,22 +53,95 @@ class QueuePacket:
         return self.gp < other.gp
 
 
+class TargetTables:
+    """
+    The tables of MinimalGriddedPerms that only depend on the target gridded
+    perms, and not on the tiling, so they can be shared by every instance.
+    Each table keeps at most maxsize entries, dropping the least recently
+    used.
+    """
+
+    def __init__(self, maxsize: int = 100000):
+        self.maxsize = maxsize
+        self.requirements_up_to_cell: LRUCache[
+            Tuple[Cell, GPTuple], GPTuple
+        ] = LRUCache(maxsize)
+        self.localised_patts: LRUCache[Tuple[Cell, GPTuple], GPTuple] = LRUCache(
+            maxsize
+        )
+        self.max_cell_counts: LRUCache[GPTuple, Dict[Cell, int]] = LRUCache(maxsize)
+        self.upward_closures: LRUCache[GPTuple, GPTuple] = LRUCache(maxsize)
+
+    def tables(self) -> Dict[str, LRUCache]:
+        """Return a dictionary from the name of each table to the table."""
+        return {
+            "requirements_up_to_cell": self.requirements_up_to_cell,
+            "localised_patts": self.localised_patts,
+            "max_cell_counts": self.max_cell_counts,
+            "upward_closures": self.upward_closures,
+        }
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Return the hits, misses, hit rate, size and maxsize of each
+        table."""
+        return {name: table.stats() for name, table in self.tables().items()}
+
+    def clear(self) -> None:
+        """Empty the tables and reset their statistics."""
+        for table in self.tables().values():
+            table.clear()
+
+
 class MinimalGriddedPerms:
-    def __init__(self, tiling: "Tiling"):
+    # The tables used by every instance that is not given its own.
+    _shared_tables = TargetTables()
+
+    def __init__(
+        self,
+        tiling: "Tiling",
+        tables: Optional[TargetTables] = None,
+        known_patts_maxsize: int = 100000,
+    ):
+        self.tiling = tiling
         self.obstructions = tiling.obstructions
+        self.obstruction_index = tiling.obstruction_index
         self.requirements = tiling.requirements
         self.relevant_obstructions: Dict[FrozenSet[Cell], GPTuple] = dict()
         self.relevant_requirements: Dict[FrozenSet[Cell], Reqs] = dict()
         self.relevant_obstructions_by_cell: Dict[
             Tuple[Cell, FrozenSet[Cell]], GPTuple
         ] = dict()
-        self.requirements_up_to_cell: Dict[Tuple[Cell, GPTuple], GPTuple] = dict()
-        # Delay computing until needed - these could all be stored on
-        # MinimalGriddedPerms, as none of these are tiling specific.
-        self.localised_patts: Dict[Tuple[Cell, GPTuple], GPTuple] = dict()
-        self.max_cell_counts: Dict[GPTuple, Dict[Cell, int]] = dict()
-        self.upward_closures: Dict[GPTuple, GPTuple] = dict()
-        self.known_patts: Dict[GriddedPerm, Set[GriddedPerm]] = defaultdict(set)
+        # Delay computing until needed - these are not tiling specific, so are
+        # shared with the other instances.
+        if tables is None:
+            tables = MinimalGriddedPerms._shared_tables
+        self.requirements_up_to_cell = tables.requirements_up_to_cell
+        self.localised_patts = tables.localised_patts
+        self.max_cell_counts = tables.max_cell_counts
+        self.upward_closures = tables.upward_closures
+        # The patterns known to be contained in the gridded perms seen most
+        # recently. Forgetting them only means checking again.
+        self.known_patts: LRUCache[GriddedPerm, Set[GriddedPerm]] = LRUCache(
+            known_patts_maxsize
+        )
+        # The largest sizes of the known_patts, the work packets done and the
+        # queue during the searches so far.
+        self.peak_sizes: Dict[str, int] = {
+            "known_patts": 0,
+            "work_packets_done": 0,
+            "queue": 0,
+        }
+
+    @classmethod
+    def shared_tables(cls) -> TargetTables:
+        """Return the tables shared by the instances."""
+        return cls._shared_tables
+
+    @classmethod
+    def set_shared_tables_maxsize(cls, maxsize: int) -> None:
+        """Replace the shared tables with empty ones holding at most maxsize
+        entries each."""
+        cls._shared_tables = TargetTables(maxsize)
 
     def get_requirements_up_to_cell(self, cell: Cell, gps: GPTuple) -> GPTuple:
         """Given a goal gps and cell (x,y), return the truncations of the reqs
@@ -101,9 +190,18 @@ class MinimalGriddedPerms:
         return res
 
     def satisfies_obstructions(
-        self, gp: GriddedPerm, must_contain: Optional[Cell] = None
+        self,
+        gp: GriddedPerm,
+        must_contain: Optional[Cell] = None,
+        index: Optional[int] = None,
     ) -> bool:
-        """Check if a gridded permutation avoids the obstructions."""
+        """Check if a gridded permutation avoids the obstructions.
+
+        If index is given, the gridded perm with the point at index removed
+        must avoid the obstructions. Then only occurrences using that point
+        are checked."""
+        if index is not None:
+            return self.obstruction_index.avoids_using_point(gp, index)
         if must_contain is None:
             obs = self.get_relevant_obstructions(gp)
         else:
@@ -119,12 +217,31 @@ class MinimalGriddedPerms:
         """An avoidance check. See contains method."""
         return not self.contains(gp, *patts)
 
+    def get_known_patts(self, gp: GriddedPerm) -> Set[GriddedPerm]:
+        """Return the set of patterns known to be contained in gp, adding an
+        empty one if there is none."""
+        known_patts = self.known_patts.get(gp)
+        if known_patts is None:
+            known_patts = set()
+            self.known_patts[gp] = known_patts
+        return known_patts
+
+    def _record_sizes(self, work_packets_done: int, queue: int) -> None:
+        """Update the peak_sizes with the current sizes."""
+        for name, size in (
+            ("known_patts", len(self.known_patts)),
+            ("work_packets_done", work_packets_done),
+            ("queue", queue),
+        ):
+            if size > self.peak_sizes[name]:
+                self.peak_sizes[name] = size
+
     def contains(self, gp: GriddedPerm, *patts: GriddedPerm) -> bool:
         """This is a an alternative containment check.
         It will return True if any element of patts is contained in gp, and add
         it to the known_patts. Only use this if it is worth caching, so in the
         usage case, if the check is related to the target gps requirement."""
-        known_patts = self.known_patts[gp]
+        known_patts = self.get_known_patts(gp)
         if any(patt in known_patts for patt in patts):
             return True
         for patt in patts:
@@ -133,12 +250,19 @@ class MinimalGriddedPerms:
                 return True
         return False
 
-    def _prepare_queue(self, queue: List[QueuePacket]) -> Iterator[GriddedPerm]:
+    def _prepare_queue(
+        self, queue: List[QueuePacket], targets: Optional[Iterable[GPTuple]] = None
+    ) -> Iterator[GriddedPerm]:
         """Add cell counters with gridded permutations to the queue.
-        The function yields all initial_gp that satisfy the requirements."""
+        The function yields all initial_gp that satisfy the requirements.
+
+        The targets are the tuples of one gridded perm from each requirement
+        list to start from, by default all of them."""
         if len(self.requirements) <= 1:
             return
-        for gps in product(*self.requirements):
+        if targets is None:
+            targets = product(*self.requirements)
+        for gps in targets:
             # try to stitch together as much of the independent cells of the
             # gridded permutation together first
             initial_gp = self.initial_gp(*gps)
@@ -229,6 +353,7 @@ class MinimalGriddedPerms:
         It assumes that gps is closed upwards."""
         res = self.max_cell_counts.get(gps)
         if res is None:
+            key = gps
             # we work with the upward closure.
             gps = self.get_upward_closure(gps)
             res = MinimalGriddedPerms.cell_counter(*gps)
@@ -257,29 +382,40 @@ class MinimalGriddedPerms:
                     if len(in_this_cell) >= 2:
                         # the dictionary is patt: v, where v is the number we
                         # can subtract from the naive bound
-                        res[cell] -= better_bounds.get(frozenset(in_this_cell), 0)
-            self.max_cell_counts[gps] = res
+                        res[cell] -= better_bounds[frozenset(in_this_cell)]
+            self.max_cell_counts[key] = res
         return res
 
-    _better_bounds = None
+    _better_bounds: Optional["BetterBounds"] = None
 
     @staticmethod
-    def better_bounds() -> Dict[FrozenSet[Perm], int]:
+    def better_bounds() -> "BetterBounds":
         """
         Return a dictionary. The entry k:v means that if a cell contains
         the full requirments in k, and no others touch it, then the upper
         bound for the number of points that will need to be placed in that
-        cell is the sum of the lenths of the perms in k, minus v.
+        cell is the sum of the lenths of the perms in k, minus v. The values
+        missing from the dictionary are computed when they are looked up.
 
         Example: a cell containing 01 and 10 has an upper bound of 3, not 4
         """
         if MinimalGriddedPerms._better_bounds is None:
             # pylint: disable=import-outside-toplevel
-            from .better_bounds import better_bounds
+            from .better_bounds import BetterBounds
 
-            MinimalGriddedPerms._better_bounds = better_bounds
+            MinimalGriddedPerms._better_bounds = BetterBounds()
         return MinimalGriddedPerms._better_bounds
 
+    @staticmethod
+    def set_better_bounds_file(path: Optional[str]) -> None:
+        """Read the better bounds computed before from the file at path, and
+        append the ones computed from now on to it. If path is None, they
+        are only kept in memory."""
+        # pylint: disable=import-outside-toplevel
+        from .better_bounds import BetterBounds
+
+        MinimalGriddedPerms._better_bounds = BetterBounds(path)
+
     def get_localised_patts(self, cell: Cell, gps: GPTuple) -> GPTuple:
         """Return the localised patts that gps must contain."""
         res = self.localised_patts.get((cell, gps))
@@ -382,8 +518,110 @@ class MinimalGriddedPerms:
             nextgp = gp.insert_specific_point(cell, idx, val)
             yield idx, nextgp
 
+    @staticmethod
+    def _next_mindices(
+        mindices: Dict[Cell, int], cell: Cell, idx: int
+    ) -> Dict[Cell, int]:
+        """Update the minimum index that we inserted a point into each cell,
+        after inserting a point at idx in cell."""
+        next_mindices = {
+            c: i if i <= idx else i + 1 for c, i in mindices.items() if c != cell
+        }
+        next_mindices[cell] = idx + 1
+        return next_mindices
+
+    def witness(self) -> Optional[GriddedPerm]:
+        """
+        Return a gridded perm on the tiling, or None if the tiling is empty.
+
+        This is the same search as minimal_gridded_perms, but it stops at the
+        first gridded perm that satisfies the requirements. The targets are
+        tried from the shortest, first checking if any initial_gp is a
+        witness. Each target is then searched depth first, taking one step of
+        each search in turn so that a target that leads nowhere does not hold
+        up the others. Only the known_patts of the gridded perms on the
+        current paths are kept.
+        """
+        if not self.requirements:
+            if GriddedPerm.empty_perm() in self.obstructions:
+                return None
+            return GriddedPerm.empty_perm()
+        if len(self.requirements) == 1:
+            return next(iter(self.requirements[0]), None)
+        targets = sorted(
+            product(*self.requirements), key=lambda gps: sum(map(len, gps))
+        )
+        work_packets_done: Set[int] = set()
+        searches: Deque[Iterator[Optional[GriddedPerm]]] = deque()
+        for gps in targets:
+            initial_gp = self.initial_gp(*gps)
+            if self.satisfies_obstructions(initial_gp):
+                if self.satisfies_requirements(initial_gp):
+                    return initial_gp
+                qpacket = QueuePacket(initial_gp, gps, (-1, -1), True, {})
+                searches.append(self._witness_search(qpacket, work_packets_done))
+        while searches:
+            self._record_sizes(len(work_packets_done), len(searches))
+            search = searches.popleft()
+            try:
+                res = next(search)
+            except StopIteration:
+                continue
+            if res is not None:
+                return res
+            searches.append(search)
+        return None
+
+    def _witness_search(
+        self, qpacket: QueuePacket, work_packets_done: Set[int]
+    ) -> Iterator[Optional[GriddedPerm]]:
+        """
+        Search depth first for a gridded perm satisfying the requirements by
+        inserting points into the gridded perm of qpacket. None is yielded
+        after each gridded perm that is expanded, and a witness is yielded as
+        soon as it is found.
+        """
+        children: List[QueuePacket] = []
+        try:
+            for (cell, localised) in self._get_cells_to_try(qpacket):
+                next_cell = qpacket.last_cell if localised else cell
+                for idx, nextgp in self.insert_point(
+                    qpacket.gp, cell, qpacket.mindices.get(cell, 0)
+                ):
+                    key = hash((nextgp, qpacket.gps, next_cell))
+                    if key in work_packets_done:
+                        continue
+                    work_packets_done.add(key)
+                    if not self.satisfies_obstructions(
+                        nextgp, must_contain=cell, index=idx
+                    ):
+                        continue
+                    known_patts = self.get_known_patts(qpacket.gp)
+                    self.get_known_patts(nextgp).update(known_patts)
+                    if self.satisfies_requirements(nextgp):
+                        yield nextgp
+                        return
+                    children.append(
+                        QueuePacket(
+                            nextgp,
+                            qpacket.gps,
+                            next_cell,
+                            localised,
+                            self._next_mindices(qpacket.mindices, cell, idx),
+                        )
+                    )
+            yield None
+            for child in children:
+                yield from self._witness_search(child, work_packets_done)
+        finally:
+            self.known_patts.pop(qpacket.gp, None)
+            for child in children:
+                self.known_patts.pop(child.gp, None)
+
     def minimal_gridded_perms(
-        self, yield_non_minimal: bool = False
+        self,
+        yield_non_minimal: bool = False,
+        targets: Optional[Iterable[GPTuple]] = None,
     ) -> Iterator[GriddedPerm]:
         """
         Yield all minimal gridded perms on the tiling.
@@ -392,6 +630,11 @@ class MinimalGriddedPerms:
         that are non-minimal, found by the initial_gp method. Even though it
         may not be minimal, this is useful when trying to determine whether or
         not a tiling is empty.
+
+        If targets is given, only the gridded perms found from those tuples of
+        one gridded perm from each requirement list are yielded. These include
+        all the minimal gridded perms that contain the tuple, but can include
+        gridded perms that contain minimal gridded perms from other targets.
         """
         if not self.requirements:
             if GriddedPerm.empty_perm() not in self.obstructions:
@@ -408,7 +651,7 @@ class MinimalGriddedPerms:
 
         initial_gps_to_auto_yield: Dict[int, Set[GriddedPerm]] = defaultdict(set)
         yielded: Set[GriddedPerm] = set()
-        for gp in self._prepare_queue(queue):
+        for gp in self._prepare_queue(queue, targets):
             if yield_non_minimal:
                 yielded.add(gp)
                 yield gp
@@ -435,8 +678,9 @@ class MinimalGriddedPerms:
                     qpacket.gp, cell, qpacket.mindices.get(cell, 0)
                 ):
                     # The work_packets_done is used to ensure the same
-                    # task is not processed twice.
-                    key = (nextgp, qpacket.gps, next_cell)
+                    # task is not processed twice. Only the hashes of the
+                    # tasks are kept, so the gridded perms can be freed.
+                    key = hash((nextgp, qpacket.gps, next_cell))
                     if key in work_packets_done:
                         continue
                     work_packets_done.add(key)
@@ -445,11 +689,14 @@ class MinimalGriddedPerms:
                     # subgridded permutation.
                     if yielded_subgridded_perm(
                         nextgp
-                    ) or not self.satisfies_obstructions(nextgp, must_contain=cell):
+                    ) or not self.satisfies_obstructions(
+                        nextgp, must_contain=cell, index=idx
+                    ):
                         continue
                     # Update the nextgp about the patterns that are
                     # contained in the subgridded permutation gp.
-                    self.known_patts[nextgp].update(self.known_patts[qpacket.gp])
+                    known_patts = self.get_known_patts(qpacket.gp)
+                    self.get_known_patts(nextgp).update(known_patts)
                     # If it satisfies the requirements, then it is a
                     # a minimal gridded permutation
                     if self.satisfies_requirements(nextgp):
@@ -458,14 +705,7 @@ class MinimalGriddedPerms:
                         yielded.add(nextgp)
                         yield nextgp
                     else:
-                        # Update the minimum index that we inserted a
-                        # a point into each cell.
-                        next_mindices = {
-                            c: i if i <= idx else i + 1
-                            for c, i in qpacket.mindices.items()
-                            if c != cell
-                        }
-                        next_mindices[cell] = idx + 1
+                        next_mindices = self._next_mindices(qpacket.mindices, cell, idx)
                         # Add the work to the queue
                         heappush(
                             queue,
@@ -478,12 +718,13 @@ class MinimalGriddedPerms:
                             ),
                         )
 
-        work_packets_done: Set[WorkPackets] = set()
+        work_packets_done: Set[int] = set()
         curr_len = -1
         while queue:
             # take the next gridded permutation of the queue, together with the
             # theoretical counts to create a gridded permutation containing
             # each of gps.
+            self._record_sizes(len(work_packets_done), len(queue))
             qpacket = heappop(queue)
             # if gp was one of the initial_gps that satisfied obs/reqs, but
             # we weren't sure at the time if it was minimal, then now is the
@@ -510,3 +751,41 @@ class MinimalGriddedPerms:
             if not yielded_subgridded_perm(gp):
                 yielded.add(gp)
                 yield gp
+
+    def parallel_minimal_gridded_perms(
+        self, executor: Executor, shards: int = 64
+    ) -> Iterator[GriddedPerm]:
+        """
+        Yield all minimal gridded perms on the tiling, by length, after
+        searching from the targets in the given number of shards with the
+        executor.
+
+        The targets are dealt to the shards in turn. Each minimal gridded perm
+        is found in the shard with its target, so it is enough to drop the
+        gridded perms that contain a smaller one from another shard.
+        """
+        if len(self.requirements) <= 1:
+            yield from self.minimal_gridded_perms()
+            return
+        targets: List[List[GPTuple]] = [[] for _ in range(shards)]
+        for i, gps in enumerate(product(*self.requirements)):
+            targets[i % shards].append(gps)
+        futures = [
+            executor.submit(_minimal_gridded_perms_of_targets, self.tiling, shard)
+            for shard in targets
+            if shard
+        ]
+        yielded: List[GriddedPerm] = []
+        for gp in merge(*(future.result() for future in futures), key=len):
+            if not gp.contains(*yielded):
+                yielded.append(gp)
+                yield gp
+
+
+def _minimal_gridded_perms_of_targets(
+    tiling: "Tiling", targets: List[GPTuple]
+) -> List[GriddedPerm]:
+    """Return the gridded perms found from the targets on the tiling, sorted
+    by length."""
+    mgps = MinimalGriddedPerms(tiling).minimal_gridded_perms(targets=targets)
+    return sorted(mgps, key=len)
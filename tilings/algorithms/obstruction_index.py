@@ -0,0 +1,106 @@
+from collections import Counter, defaultdict
+from operator import itemgetter
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from ..griddedperm import GriddedPerm
+
+Cell = Tuple[int, int]
+CellCount = Tuple[Tuple[Cell, int], ...]
+Group = Tuple[int, CellCount, List[GriddedPerm]]
+
+
+class ObstructionIndex:
+    """
+    A store of obstructions for testing if gridded perms avoid them.
+
+    The obstructions are grouped by the number of points they have in each
+    cell. A gridded perm can only contain an obstruction if it has at least as
+    many points in each cell, so a whole group is discarded by comparing the
+    cell counts before doing any occurrence search. Obstructions can also be
+    added one at a time with the add method.
+    """
+
+    def __init__(self, obstructions: Iterable[GriddedPerm] = tuple()):
+        self._obstructions: List[GriddedPerm] = list(obstructions)
+        self._group_of: Dict[CellCount, List[GriddedPerm]] = defaultdict(list)
+        for ob in self._obstructions:
+            self._group_of[self._cell_count(ob)].append(ob)
+        # The groups are sorted by length, so we can stop once the obstructions
+        # are longer than the gridded perm.
+        self._groups: List[Group] = sorted(
+            (
+                (sum(num for _, num in cell_count), cell_count, obs)
+                for cell_count, obs in self._group_of.items()
+            ),
+            key=itemgetter(0),
+        )
+        self._groups_by_cell: Dict[Cell, List[Group]] = defaultdict(list)
+        for group in self._groups:
+            for cell, _ in group[1]:
+                self._groups_by_cell[cell].append(group)
+
+    @staticmethod
+    def _cell_count(ob: GriddedPerm) -> CellCount:
+        return tuple(sorted(Counter(ob.pos).items()))
+
+    def add(self, ob: GriddedPerm) -> None:
+        """Add the obstruction to the index."""
+        self._obstructions.append(ob)
+        cell_count = self._cell_count(ob)
+        obs = self._group_of[cell_count]
+        obs.append(ob)
+        if len(obs) == 1:
+            group = (len(ob), cell_count, obs)
+            self._insert_group(self._groups, group)
+            for cell, _ in cell_count:
+                self._insert_group(self._groups_by_cell[cell], group)
+
+    @staticmethod
+    def _insert_group(groups: List[Group], group: Group) -> None:
+        """Insert the group after all the groups that are not longer."""
+        length = group[0]
+        idx = len(groups)
+        while idx > 0 and groups[idx - 1][0] > length:
+            idx -= 1
+        groups.insert(idx, group)
+
+    @staticmethod
+    def _fitting(gp: GriddedPerm, groups: Iterable[Group]) -> Iterator[GriddedPerm]:
+        """Yield the obstructions in groups that have no more points in each
+        cell than gp."""
+        pos = gp.pos
+        length = len(pos)
+        for group_length, cell_count, obs in groups:
+            if group_length > length:
+                return
+            if all(pos.count(cell) >= num for cell, num in cell_count):
+                yield from obs
+
+    def obstructions_fitting(self, gp: GriddedPerm) -> Iterator[GriddedPerm]:
+        """Yield the obstructions that could possibly occur in gp."""
+        return self._fitting(gp, self._groups)
+
+    def contains(self, gp: GriddedPerm) -> bool:
+        """Return True if gp contains one of the obstructions."""
+        return gp.contains(*self._fitting(gp, self._groups))
+
+    def avoids(self, gp: GriddedPerm) -> bool:
+        """Return True if gp avoids all of the obstructions."""
+        return not self.contains(gp)
+
+    def contains_using_point(self, gp: GriddedPerm, index: int) -> bool:
+        """Return True if gp contains an occurrence of one of the obstructions
+        that uses the point at index."""
+        groups = self._groups_by_cell.get(gp.pos[index], ())
+        return gp.contains_using_point(index, *self._fitting(gp, groups))
+
+    def avoids_using_point(self, gp: GriddedPerm, index: int) -> bool:
+        """Return True if gp has no occurrence of an obstruction that uses the
+        point at index."""
+        return not self.contains_using_point(gp, index)
+
+    def __iter__(self) -> Iterator[GriddedPerm]:
+        return iter(self._obstructions)
+
+    def __len__(self) -> int:
+        return len(self._obstructions)
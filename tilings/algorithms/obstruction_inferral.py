@@ -3,6 +3,8 @@ from typing import TYPE_CHECKING, Iterable, List, Optional, Set, Tuple
 
 from tilings import GriddedPerm
 
+from .emptiness import EmptinessChecker
+
 if TYPE_CHECKING:
     from tilings import Tiling
 
@@ -33,17 +35,41 @@ class ObstructionInferral(abc.ABC):
         if self._new_obs is not None:
             return self._new_obs
         newobs: List[GriddedPerm] = []
+        tiling_bytes: Optional[bytes] = None
+        if EmptinessChecker.cache() is not None:
+            tiling_bytes = self._tiling.to_bytes()
         for ob in sorted(self.potential_new_obs(), key=len):
             cont_newob = any(newob in ob for newob in newobs)
-            if not cont_newob and self.can_add_obstruction(ob, self._tiling):
+            if not cont_newob and self.can_add_obstruction(
+                ob, self._tiling, tiling_bytes
+            ):
                 newobs.append(ob)
         self._new_obs = newobs
         return self._new_obs
 
     @staticmethod
-    def can_add_obstruction(obstruction: GriddedPerm, tiling: "Tiling") -> bool:
-        """Return true if `obstruction` can be added to `tiling`."""
-        return tiling.add_requirement(obstruction.patt, obstruction.pos).is_empty()
+    def can_add_obstruction(
+        obstruction: GriddedPerm,
+        tiling: "Tiling",
+        tiling_bytes: Optional[bytes] = None,
+    ) -> bool:
+        """Return true if `obstruction` can be added to `tiling`.
+
+        If the cache of EmptinessChecker is enabled, the result is stored in
+        it under the bytes of the tiling followed by those of the obstruction.
+        The bytes of the tiling can be passed in, if they are already known.
+        """
+        cache = EmptinessChecker.cache()
+        if cache is None:
+            return tiling.add_requirement(obstruction.patt, obstruction.pos).is_empty()
+        if tiling_bytes is None:
+            tiling_bytes = tiling.to_bytes()
+        key = tiling_bytes + obstruction.to_bytes()
+        res = cache.get(key)
+        if res is None:
+            res = tiling.add_requirement(obstruction.patt, obstruction.pos).is_empty()
+            cache[key] = res
+        return res
 
     def obstruction_inferral(self) -> "Tiling":
         """
@@ -1,12 +1,15 @@
 import abc
 from importlib import import_module
 from itertools import chain
-from typing import Iterable, List, Optional, Tuple, Type
+from typing import TYPE_CHECKING, Iterable, List, Optional, Tuple, Type, Union
 
 from permuta import Perm
 
 from .griddedperm import GriddedPerm
 
+if TYPE_CHECKING:
+    from .algorithms import ObstructionIndex
+
 Cell = Tuple[int, int]
 
 
@@ -21,25 +24,31 @@ class TrackingAssumption:
 
     def avoiding(
         self,
-        obstructions: Iterable[GriddedPerm],
+        obstructions: Union[Iterable[GriddedPerm], "ObstructionIndex"],
         active_cells: Optional[Iterable[Cell]] = None,
     ) -> "TrackingAssumption":
         """
         Return the tracking absumption where all of the gridded perms avoiding
         the obstructions are removed. If active_cells is not None, then any
         assumptions involving a cell not in active_cells will be removed.
+
+        The obstructions can also be given as an ObstructionIndex, e.g., the
+        obstruction_index of a tiling.
         """
-        obstructions = tuple(obstructions)
+        from .algorithms import ObstructionIndex
+
+        if not isinstance(obstructions, ObstructionIndex):
+            obstructions = ObstructionIndex(obstructions)
         if active_cells is not None:
             return self.__class__(
                 tuple(
                     gp
                     for gp in self.gps
                     if all(cell in active_cells for cell in gp.pos)
-                    and gp.avoids(*obstructions)
+                    and obstructions.avoids(gp)
                 )
             )
-        return self.__class__(tuple(gp for gp in self.gps if gp.avoids(*obstructions)))
+        return self.__class__(tuple(gp for gp in self.gps if obstructions.avoids(gp)))
 
     def get_value(self, gp: GriddedPerm) -> int:
         """
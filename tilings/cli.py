@@ -97,7 +97,7 @@ def search_spec(args):
     """
     pack = build_pack(args)
     start_class = Tiling.from_string(args.basis)
-    css = TileScope(start_class, pack)
+    css = TileScope(start_class, pack, cache_dir=args.cache_dir)
     spec = css.auto_search(status_update=30)
     logger.info("The generating function is %s", spec.get_genf())
     return 0
@@ -150,6 +150,12 @@ parser_tree.add_argument(
 parser_tree.add_argument(
     "-e", "--elementary", action="store_true", help="Makes the pack elementary."
 )
+parser_tree.add_argument(
+    "--cache-dir",
+    type=str,
+    help="A directory to store the emptiness results and the bounds used by the "
+    "minimal gridded perm searches in, which later searches reuse.",
+)
 parser_tree.set_defaults(func=search_spec)
 
 
@@ -1,37 +1,143 @@
 import json
 from itertools import chain, combinations, product
-from typing import Callable, Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple
+from weakref import WeakValueDictionary
+from typing import (
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
 
 from comb_spec_searcher import CombinatorialObject
 from permuta import Perm
 from permuta.misc import DIR_EAST, DIR_NORTH, DIR_SOUTH, DIR_WEST, UnionFind
 
+from .misc import read_varint, write_varint
+
 Cell = Tuple[int, int]
 Position = Tuple[Cell, ...]
 
+# Cells are shared between all the gridded perms decompressed, so that each
+# distinct cell is stored only once.
+_CELLS: Dict[Cell, Cell] = {}
+
+# Patterns are shared between all the gridded perms read from bytes, keyed by
+# their bytes.
+_PATTS: Dict[bytes, Perm] = {}
+
+
+def _zigzag(n: int) -> int:
+    return 2 * n if n >= 0 else -2 * n - 1
+
+
+def _unzigzag(n: int) -> int:
+    return n >> 1 if not n & 1 else -(n >> 1) - 1
+
+
+# The moves between consecutive cells that are written as a single byte, with
+# the column difference in bits 4-6 and the zigzag encoding of the row
+# difference in bits 0-3.
+_SHORT_MOVES: Tuple[Cell, ...] = tuple(
+    (b >> 4, _unzigzag(b & 0xF)) for b in range(0x80)
+)
+
+# For each index of a pattern, the indices of the largest smaller value and the
+# smallest larger value to its left, or -1 if there is none.
+_LEFT_FLOOR_CEILING: Dict[Perm, Tuple[Tuple[int, int], ...]] = {}
+
+
+def _left_floor_and_ceiling(patt: Perm) -> Tuple[Tuple[int, int], ...]:
+    res = _LEFT_FLOOR_CEILING.get(patt)
+    if res is None:
+        details = []
+        for idx, val in enumerate(patt):
+            floor, ceiling = -1, -1
+            for j in range(idx):
+                if patt[j] < val and (floor == -1 or patt[j] > patt[floor]):
+                    floor = j
+                elif patt[j] > val and (ceiling == -1 or patt[j] < patt[ceiling]):
+                    ceiling = j
+            details.append((floor, ceiling))
+        res = tuple(details)
+        _LEFT_FLOOR_CEILING[patt] = res
+    return res
+
 
 class GriddedPerm(CombinatorialObject):
+    # Millions of gridded perms are alive during a search, so we avoid a
+    # per-instance __dict__ and only compute the set of cells and the hash
+    # when they are first needed.
+    __slots__ = ("_patt", "_pos", "_cells", "_hash")
+
+    # The optional interning pool. It is keyed by (patt, pos) so that the keys
+    # do not keep the gridded perms alive.
+    _pool: Optional["WeakValueDictionary[Tuple[Perm, Position], GriddedPerm]"] = None
+    _pool_lookups = 0
+    _pool_hits = 0
+
     def __init__(self, pattern: Perm, positions: Iterable[Cell]):
         if not isinstance(pattern, Perm):
             raise ValueError("Variable 'pattern' should be an instance of permuta.Perm")
-        if not pattern:
-            self._patt = pattern
-            self._pos = tuple(positions)
-            self._cells: FrozenSet[Cell] = frozenset()
-            self._rows = 1
-            self._columns = 1
-        else:
-            # Pattern should be a Perm of course
-            self._patt = pattern
-            # Position is a tuple of (x, y) coordinates, where the ith (x, y)
-            # corresponds to the i-th point in the pattern.
-            self._pos = tuple(positions)
+        # Pattern should be a Perm of course
+        self._patt = pattern
+        # Position is a tuple of (x, y) coordinates, where the ith (x, y)
+        # corresponds to the i-th point in the pattern.
+        self._pos = tuple(positions)
+        if pattern and len(self._patt) != len(self._pos):
+            raise ValueError(("Pattern and position list have unequal" "lengths."))
+        # Immutable set of cells which the gridded permutation spans, computed
+        # lazily by the `_cell_set` method.
+        self._cells: Optional[FrozenSet[Cell]] = None
+        self._hash: Optional[int] = None
 
-            if len(self._patt) != len(self._pos):
-                raise ValueError(("Pattern and position list have unequal" "lengths."))
+    @classmethod
+    def enable_interning(cls) -> None:
+        """Turn on the interning pool. While it is on, `interned` returns a
+        single shared object for all equal gridded perms."""
+        if GriddedPerm._pool is None:
+            GriddedPerm._pool = WeakValueDictionary()
 
-            # Immutable set of cells which the gridded permutation spans.
-            self._cells = frozenset(self._pos)
+    @classmethod
+    def disable_interning(cls) -> None:
+        """Turn off the interning pool and reset its statistics."""
+        GriddedPerm._pool = None
+        GriddedPerm._pool_lookups = 0
+        GriddedPerm._pool_hits = 0
+
+    @classmethod
+    def interning_enabled(cls) -> bool:
+        """Return True if the interning pool is on."""
+        return GriddedPerm._pool is not None
+
+    @classmethod
+    def interning_stats(cls) -> Dict[str, int]:
+        """Return the number of lookups and hits in the interning pool, and
+        the number of gridded perms currently in it."""
+        return {
+            "lookups": GriddedPerm._pool_lookups,
+            "hits": GriddedPerm._pool_hits,
+            "size": len(GriddedPerm._pool) if GriddedPerm._pool is not None else 0,
+        }
+
+    def interned(self) -> "GriddedPerm":
+        """Return the gridded perm from the interning pool that is equal to
+        self. If the pool is off, self is returned."""
+        pool = GriddedPerm._pool
+        if pool is None:
+            return self
+        GriddedPerm._pool_lookups += 1
+        key = (self._patt, self._pos)
+        res = pool.get(key)
+        if res is None:
+            pool[key] = self
+            return self
+        GriddedPerm._pool_hits += 1
+        return res
 
     @classmethod
     def single_cell(cls, pattern: Perm, cell: Cell) -> "GriddedPerm":
@@ -67,14 +173,95 @@ class GriddedPerm(CombinatorialObject):
                     return True
         return False
 
+    def _cell_set(self) -> FrozenSet[Cell]:
+        """Return the set of cells the gridded permutation spans."""
+        if self._cells is None:
+            self._cells = frozenset(self._pos)
+        return self._cells
+
     def occupies(self, cell: Cell) -> bool:
         """Checks if the gridded permutation has a point in the given cell."""
-        return cell in self._cells
+        return cell in self._cell_set()
 
     def occurrences_in(self, other: "GriddedPerm") -> Iterator[Tuple[int, ...]]:
         """Returns all occurrences of self in other."""
         yield from self._patt.occurrences_in(other.patt, self.pos, other.pos)
 
+    def occurrences_in_using_point(
+        self, other: "GriddedPerm", index: int
+    ) -> Iterator[Tuple[int, ...]]:
+        """Returns all occurrences of self in other that use the point at the
+        given index of other."""
+        res: List[Tuple[int, ...]] = []
+        self._search_using_point(other, index, res)
+        yield from res
+
+    def occurs_in_using_point(self, other: "GriddedPerm", index: int) -> bool:
+        """Checks if self occurs in other using the point at the given index of
+        other."""
+        return self._search_using_point(other, index, None)
+
+    def _search_using_point(
+        self,
+        other: "GriddedPerm",
+        index: int,
+        found: Optional[List[Tuple[int, ...]]],
+    ) -> bool:
+        """Search for occurrences of self in other that use the point at the
+        given index of other. If found is None, return True as soon as one is
+        found, otherwise add all of them to found."""
+        patt, pos = self._patt, self._pos
+        other_patt, other_pos = other._patt, other._pos
+        n, m = len(patt), len(other_patt)
+        details = _left_floor_and_ceiling(patt)
+        occurrence = [0] * n
+
+        def search(k: int, start: int, forced: int) -> bool:
+            # The k-th point of self is placed at an index in other that is at
+            # least start. Points before the forced one must be left of index.
+            if k == forced:
+                candidates: Iterable[int] = (index,)
+            elif k < forced:
+                candidates = range(start, index - forced + k + 1)
+            else:
+                candidates = range(start, m - n + k + 1)
+            # The smallest and largest values the point can take.
+            val = patt[k]
+            floor, ceiling = details[k]
+            low = (
+                val
+                if floor == -1
+                else other_patt[occurrence[floor]] + val - patt[floor]
+            )
+            high = (
+                m - n + val
+                if ceiling == -1
+                else other_patt[occurrence[ceiling]] - patt[ceiling] + val
+            )
+            if k < forced:
+                if val < patt[forced]:
+                    high = min(high, other_patt[index] - patt[forced] + val)
+                else:
+                    low = max(low, other_patt[index] - patt[forced] + val)
+            cell = pos[k]
+            for i in candidates:
+                if other_pos[i] == cell and low <= other_patt[i] <= high:
+                    occurrence[k] = i
+                    if k < n - 1:
+                        if search(k + 1, i + 1, forced):
+                            return True
+                    elif found is None:
+                        return True
+                    else:
+                        found.append(tuple(occurrence))
+            return False
+
+        cell = other_pos[index]
+        for forced in range(max(0, n - m + index), min(n, index + 1)):
+            if pos[forced] == cell and search(0, 0, forced):
+                return True
+        return False
+
     def occurs_in(self, other: "GriddedPerm") -> bool:
         """Checks if self occurs in other."""
         return any(self.occurrences_in(other))
@@ -87,6 +274,20 @@ class GriddedPerm(CombinatorialObject):
         """Return true if self contains an occurrence of any of patts."""
         return any(any(True for _ in patt.occurrences_in(self)) for patt in patts)
 
+    def avoids_using_point(self, index: int, *patts: "GriddedPerm") -> bool:
+        """Return true if self has no occurrence of any of patts that uses the
+        point at the given index."""
+        return not self.contains_using_point(index, *patts)
+
+    def contains_using_point(self, index: int, *patts: "GriddedPerm") -> bool:
+        """Return true if self contains an occurrence of any of patts that uses
+        the point at the given index.
+
+        If self with the point at index removed avoids patts, then this is the
+        same as self.contains(*patts), but only a fraction of the occurrences
+        are searched."""
+        return any(patt.occurs_in_using_point(self, index) for patt in patts)
+
     def remove_cells(self, cells: Iterable[Cell]) -> "GriddedPerm":
         """Remove any points in the cell given and return a new gridded
         permutation."""
@@ -392,7 +593,81 @@ class GriddedPerm(CombinatorialObject):
         n = len(array)
         patt = Perm(array[i] for i in range(n // 3))
         pos = zip(array[n // 3 :: 2], array[n // 3 + 1 :: 2])
-        return cls(patt, pos)
+        return cls(patt, (_CELLS.setdefault(cell, cell) for cell in pos))
+
+    def write_bytes(self, buf: bytearray) -> None:
+        """Append the gridded perm to buf in the compact format read by
+        read_bytes. The length and the values of the pattern are written as
+        varints, and each cell as the move from the previous cell, starting
+        from (0, 0). A move of at most 7 columns right, 7 rows up and 8 rows
+        down is a single byte, any other move is a 0x80 byte followed by the
+        zigzag encoded differences as varints."""
+        length = len(self._patt)
+        write_varint(buf, length)
+        if length <= 0x80:
+            buf.extend(self._patt)
+        else:
+            for val in self._patt:
+                write_varint(buf, val)
+        prev_x, prev_y = 0, 0
+        for x, y in self._pos:
+            move_x, zig_y = x - prev_x, _zigzag(y - prev_y)
+            if 0 <= move_x < 0x8 and zig_y < 0x10:
+                buf.append(move_x << 4 | zig_y)
+            else:
+                buf.append(0x80)
+                write_varint(buf, _zigzag(move_x))
+                write_varint(buf, zig_y)
+            prev_x, prev_y = x, y
+
+    @classmethod
+    def read_bytes(cls, view: Sequence[int], offset: int) -> Tuple["GriddedPerm", int]:
+        """Return the gridded perm written by write_bytes at the offset of
+        view, together with the offset after it."""
+        length = view[offset]
+        if length < 0x80:
+            offset += 1
+        else:
+            length, offset = read_varint(view, offset)
+        if length <= 0x80:
+            key = bytes(view[offset : offset + length])
+            patt = _PATTS.get(key)
+            if patt is None:
+                patt = _PATTS[key] = Perm(key)
+            offset += length
+        else:
+            vals = []
+            for _ in range(length):
+                val, offset = read_varint(view, offset)
+                vals.append(val)
+            patt = Perm(vals)
+        pos = []
+        x, y = 0, 0
+        for _ in range(length):
+            byte = view[offset]
+            offset += 1
+            if byte < 0x80:
+                move_x, move_y = _SHORT_MOVES[byte]
+            else:
+                zig_x, offset = read_varint(view, offset)
+                zig_y, offset = read_varint(view, offset)
+                move_x, move_y = _unzigzag(zig_x), _unzigzag(zig_y)
+            x += move_x
+            y += move_y
+            cell = (x, y)
+            pos.append(_CELLS.setdefault(cell, cell))
+        return cls(patt, pos), offset
+
+    def to_bytes(self) -> bytes:
+        """Return the gridded perm in the format written by write_bytes."""
+        buf = bytearray()
+        self.write_bytes(buf)
+        return bytes(buf)
+
+    @classmethod
+    def from_bytes(cls, arrbytes: bytes) -> "GriddedPerm":
+        """Return the gridded perm compressed by to_bytes."""
+        return cls.read_bytes(memoryview(arrbytes), 0)[0]
 
     # Symmetries
     def reverse(self, transf: Callable[[Cell], Cell]) -> "GriddedPerm":
@@ -518,10 +793,18 @@ class GriddedPerm(CombinatorialObject):
     def __str__(self) -> str:
         return "{}: {}".format(str(self._patt), ", ".join(str(c) for c in self.pos))
 
+    def __reduce__(self) -> Tuple[Callable[[bytes], "GriddedPerm"], Tuple[bytes]]:
+        # Pickle the compact bytes instead of the pattern and the cells.
+        return self.__class__.from_bytes, (self.to_bytes(),)
+
     def __hash__(self) -> int:
-        return hash(self._patt) ^ hash(self._pos)
+        if self._hash is None:
+            self._hash = hash(self._patt) ^ hash(self._pos)
+        return self._hash
 
     def __eq__(self, other: object) -> bool:
+        if self is other:
+            return True
         if not isinstance(other, self.__class__):
             return False
         return self._patt == other.patt and self._pos == other.pos
@@ -2,11 +2,25 @@
 Collection of function that are not directly related to the code but still
 useful.
 """
+from collections import OrderedDict
 from functools import reduce
-from typing import Dict, Iterable, Iterator, Sequence, Set, Tuple, TypeVar
+from typing import (
+    Dict,
+    Generic,
+    Hashable,
+    Iterable,
+    Iterator,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    TypeVar,
+)
 
 Vertex = TypeVar("Vertex")
 T = TypeVar("T")
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
 AdjTable = Dict[Vertex, Set[Vertex]]
 Cell = Tuple[int, int]
 
@@ -39,6 +53,116 @@ def intersection_reduce(iterables: Iterable[Iterable[T]]) -> Set[T]:
         return set()
 
 
+class LRUCache(Generic[K, V]):
+    """
+    A mapping that holds at most maxsize items. When it is full, the least
+    recently used item is dropped. The hits and misses of `get` are counted.
+
+    >>> cache = LRUCache(2)
+    >>> cache[1], cache[2] = "a", "b"
+    >>> cache.get(1)
+    'a'
+    >>> cache[3] = "c"
+    >>> cache.get(2) is None, len(cache)
+    (True, 2)
+    >>> cache.stats()["hit_rate"]
+    0.5
+    """
+
+    def __init__(self, maxsize: int = 128):
+        if maxsize < 1:
+            raise ValueError("The maxsize of the cache should be positive.")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[K, V]" = OrderedDict()
+
+    def get(self, key: K, default: Optional[V] = None) -> Optional[V]:
+        """Return the value for key, and mark it as the most recently used."""
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def __setitem__(self, key: K, value: V) -> None:
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._data
+
+    def pop(self, key: K, default: Optional[V] = None) -> Optional[V]:
+        """Remove the key and return its value, or default if it is not in the
+        cache."""
+        return self._data.pop(key, default)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def clear(self) -> None:
+        """Remove all the items and reset the hits and misses."""
+        self._data.clear()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """The fraction of the calls to get that were hits."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> Dict[str, float]:
+        """Return the hits, misses, hit rate, size and maxsize of the cache."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+        }
+
+
+def write_varint(buf: bytearray, n: int) -> None:
+    """
+    Append the non-negative integer n to buf, seven bits per byte starting with
+    the lowest, with the high bit set on every byte but the last.
+
+    >>> buf = bytearray()
+    >>> write_varint(buf, 5); write_varint(buf, 300)
+    >>> bytes(buf)
+    b'\\x05\\xac\\x02'
+    """
+    while n >= 0x80:
+        buf.append((n & 0x7F) | 0x80)
+        n >>= 7
+    buf.append(n)
+
+
+def read_varint(view: Sequence[int], offset: int) -> Tuple[int, int]:
+    """
+    Return the integer written by write_varint at the offset, together with the
+    offset after it.
+
+    >>> read_varint(b'\\x05\\xac\\x02', 1)
+    (300, 3)
+    """
+    res = 0
+    shift = 0
+    while True:
+        byte = view[offset]
+        offset += 1
+        res |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return res, offset
+        shift += 7
+
+
 def is_tree(vertices: Sequence[Vertex], edges: Sequence[Tuple[Vertex, Vertex]]) -> bool:
     """
     Return True if the undirected graph is a tree.
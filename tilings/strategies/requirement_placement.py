@@ -79,7 +79,7 @@ class RequirementPlacementStrategy(DisjointUnionStrategy[Tiling, GriddedPerm]):
             child = children[0]
             for assumption in comb_class.assumptions:
                 mapped_assumption = child.forward_map_assumption(assumption).avoiding(
-                    child.obstructions
+                    child.obstruction_index
                 )
                 if mapped_assumption.gps:
                     parent_var = comb_class.get_parameter(assumption)
@@ -1,4 +1,5 @@
 import collections
+import os
 from collections import defaultdict
 from typing import Iterable, Optional, Union
 
@@ -9,6 +10,8 @@ from comb_spec_searcher.strategies import StrategyFactory
 from permuta import Perm
 from permuta.descriptors import Basis
 from tilings import GriddedPerm, Tiling
+from tilings.algorithms import EmptinessChecker, MinimalGriddedPerms
+from tilings.algorithms.better_bounds import BetterBounds
 from tilings.strategy_pack import TileScopePack
 
 __all__ = ("TileScope", "TileScopePack")
@@ -25,10 +28,21 @@ class TileScope(CombinatorialSpecificationSearcher):
         start_class: Union[str, Iterable[Perm], Tiling],
         strategy_pack: TileScopePack,
         logger_kwargs: Optional[dict] = None,
+        cache_dir: Optional[str] = None,
         **kwargs
     ) -> None:
 
-        """Initialise TileScope."""
+        """Initialise TileScope.
+
+        If cache_dir is given, the emptiness results are stored in a database
+        in that directory, and the better bounds computed by the minimal
+        gridded perm searches in a file, which later searches can reuse.
+        """
+        if cache_dir is not None:
+            EmptinessChecker.enable_cache(cache_dir)
+            MinimalGriddedPerms.set_better_bounds_file(
+                os.path.join(cache_dir, BetterBounds.FILENAME)
+            )
         if isinstance(start_class, str):
             basis = Basis(
                 [Perm.to_standard([int(c) for c in p]) for p in start_class.split("_")]
@@ -5,11 +5,13 @@
 # pylint: disable=too-many-statements
 # pylint: disable=import-outside-toplevel
 import json
+import random
 from array import array
 from collections import Counter, defaultdict
-from functools import partial
+from concurrent.futures import Executor
+from functools import partial, reduce
 from itertools import chain, filterfalse, product
-from operator import xor
+from operator import mul, xor
 from typing import (
     Callable,
     Dict,
@@ -33,6 +35,7 @@ from permuta.misc import DIR_EAST, DIR_WEST
 from .algorithms import (
     AllObstructionInferral,
     ComponentFusion,
+    EmptinessChecker,
     EmptyCellInferral,
     Factor,
     FactorWithInterleaving,
@@ -41,6 +44,7 @@ from .algorithms import (
     GriddedPermReduction,
     GriddedPermsOnTiling,
     MinimalGriddedPerms,
+    ObstructionIndex,
     ObstructionTransitivity,
     RequirementPlacement,
     RowColSeparation,
@@ -53,7 +57,14 @@ from .assumptions import (
 )
 from .exception import InvalidOperationError
 from .griddedperm import GriddedPerm
-from .misc import intersection_reduce, map_cell, union_reduce
+from .misc import (
+    LRUCache,
+    intersection_reduce,
+    map_cell,
+    read_varint,
+    union_reduce,
+    write_varint,
+)
 
 __all__ = ["Tiling"]
 
@@ -72,15 +83,26 @@ CachedProperties = TypedDict(
         "active_cells": CellFrozenSet,
         "backward_map": CellMap,
         "cell_basis": CellBasis,
+        "cells_in_col": Dict[int, CellFrozenSet],
+        "cells_in_row": Dict[int, CellFrozenSet],
         "dimensions": Dimension,
         "empty_cells": CellFrozenSet,
         "forward_map": CellMap,
+        "obstruction_index": ObstructionIndex,
         "point_cells": CellFrozenSet,
         "positive_cells": CellFrozenSet,
+        "positive_in_col": "Counter[int]",
+        "positive_in_row": "Counter[int]",
         "possibly_empty": CellFrozenSet,
     },
     total=False,
 )
+TilingState = Tuple[
+    Tuple[GriddedPerm, ...],
+    Tuple[ReqList, ...],
+    Tuple[TrackingAssumption, ...],
+    CachedProperties,
+]
 
 
 class Tiling(CombinatorialClass):
@@ -93,6 +115,17 @@ class Tiling(CombinatorialClass):
     cells and the active cells.
     """
 
+    # The optional construction cache. It maps the input of the constructor
+    # to the state of the finished tiling.
+    _construction_cache: Optional[LRUCache[tuple, TilingState]] = None
+
+    # The searches used for random sampling, which keep their count tables.
+    _samplers: LRUCache[Tuple["Tiling", int], GriddedPermsOnTiling] = LRUCache(8)
+
+    # The header of version 2 of the bytes format. In version 1 it would be the
+    # start of a tiling with 65535 obstructions.
+    _BYTES_V2_HEADER = b"\xff\xff\x02"
+
     def __init__(
         self,
         obstructions: Iterable[GriddedPerm] = tuple(),
@@ -115,6 +148,32 @@ class Tiling(CombinatorialClass):
         self._cached_properties: CachedProperties = {}
 
         super().__init__()
+        # Only the tilings that need simplifying are worth caching.
+        cache = Tiling._construction_cache if simplify else None
+        if cache is not None:
+            obstructions = tuple(obstructions)
+            requirements = tuple(tuple(r) for r in requirements)
+            assumptions = tuple(assumptions)
+            key = (
+                obstructions,
+                requirements,
+                assumptions,
+                remove_empty_rows_and_cols,
+                derive_empty,
+                sorted_input,
+                already_minimized_obs,
+            )
+            state = cache.get(key)
+            if state is not None:
+                (
+                    self._obstructions,
+                    self._requirements,
+                    self._assumptions,
+                    cached_properties,
+                ) = state
+                self._cached_properties = cached_properties.copy()
+                return
+
         if sorted_input:
             # Set of obstructions
             self._obstructions = tuple(obstructions)
@@ -163,6 +222,46 @@ class Tiling(CombinatorialClass):
             self._cached_properties["positive_cells"] = frozenset()
             self._cached_properties["possibly_empty"] = frozenset()
 
+        if GriddedPerm.interning_enabled():
+            self._intern_griddedperms()
+
+        if cache is not None:
+            cache[key] = (
+                self._obstructions,
+                self._requirements,
+                self._assumptions,
+                self._cached_properties.copy(),
+            )
+
+    @classmethod
+    def enable_construction_cache(cls, maxsize: int = 10000) -> None:
+        """Turn on the construction cache. While it is on, the state of the
+        last maxsize tilings built is kept, and building a tiling from the same
+        input again reuses it instead of simplifying the input."""
+        if (
+            Tiling._construction_cache is None
+            or Tiling._construction_cache.maxsize != maxsize
+        ):
+            Tiling._construction_cache = LRUCache(maxsize)
+
+    @classmethod
+    def disable_construction_cache(cls) -> None:
+        """Turn off the construction cache and reset its statistics."""
+        Tiling._construction_cache = None
+
+    @classmethod
+    def construction_cache_enabled(cls) -> bool:
+        """Return True if the construction cache is on."""
+        return Tiling._construction_cache is not None
+
+    @classmethod
+    def construction_cache_stats(cls) -> Dict[str, float]:
+        """Return the hits, misses, hit rate, size and maxsize of the
+        construction cache."""
+        if Tiling._construction_cache is None:
+            return {"hits": 0, "misses": 0, "hit_rate": 0.0, "size": 0, "maxsize": 0}
+        return Tiling._construction_cache.stats()
+
     @classmethod
     def from_perms(
         cls,
@@ -244,6 +343,14 @@ class Tiling(CombinatorialClass):
         self._obstructions = GPR.obstructions
         self._requirements = GPR.requirements
 
+    def _intern_griddedperms(self) -> None:
+        """Replace the obstructions and requirements with the equal gridded
+        perms from the interning pool of GriddedPerm."""
+        self._obstructions = tuple(gp.interned() for gp in self._obstructions)
+        self._requirements = tuple(
+            tuple(gp.interned() for gp in reqlist) for reqlist in self._requirements
+        )
+
     def _remove_empty_rows_and_cols(self) -> None:
         """Remove empty rows and columns."""
         # Produce the mapping between the two tilings
@@ -312,6 +419,10 @@ class Tiling(CombinatorialClass):
             max(col_mapping.values()) + 1,
             max(row_mapping.values()) + 1,
         )
+        self._cached_properties.pop("cells_in_row", None)
+        self._cached_properties.pop("cells_in_col", None)
+        self._cached_properties.pop("positive_in_row", None)
+        self._cached_properties.pop("positive_in_col", None)
 
     def _minimize_mapping(self) -> Tuple[Dict[int, int], Dict[int, int], bool]:
         """
@@ -341,9 +452,12 @@ class Tiling(CombinatorialClass):
         TODO: this should remove points that are placed, and other requirements
         that are contained in every gridded perm.
         """
+        if not self._assumptions:
+            return
         res: List[TrackingAssumption] = []
+        obstruction_index = ObstructionIndex(self._obstructions)
         for assumption in self.assumptions:
-            ass = assumption.avoiding(self._obstructions, self.active_cells)
+            ass = assumption.avoiding(obstruction_index, self.active_cells)
             if ass.gps:
                 res.append(ass)
         self._assumptions = tuple(sorted(set(res)))
@@ -352,11 +466,67 @@ class Tiling(CombinatorialClass):
     # Compression
     # -------------------------------------------------------------
 
-    def to_bytes(self) -> bytes:
-        """Compresses the tiling by flattening the sets of cells into lists of
-        integers which are concatenated together, every list preceeded by its
-        size. The obstructions are compressed and concatenated to the list, as
-        are the requirement lists."""
+    def to_bytes(self, version: int = 2) -> bytes:
+        """Compresses the tiling into bytes that from_bytes reads back.
+
+        Version 2 starts with a three byte header. The obstructions, the
+        requirement lists and the assumptions follow, each list preceeded by
+        its size written as a varint, and the gridded perms are written with
+        GriddedPerm.write_bytes.
+
+        Version 1 flattens the sets of cells into lists of integers which are
+        concatenated together, every list preceeded by its size. The
+        obstructions are compressed and concatenated to the list, as are the
+        requirement lists. Every number is a single byte, and every size two
+        bytes."""
+        if version == 1:
+            return self._to_bytes_v1()
+        if version != 2:
+            raise ValueError("Unknown version {} of the bytes format.".format(version))
+        buf = bytearray(Tiling._BYTES_V2_HEADER)
+
+        def write_gp_list(gps: Tuple[GriddedPerm, ...]) -> None:
+            write_varint(buf, len(gps))
+            for gp in gps:
+                gp.write_bytes(buf)
+
+        write_gp_list(self._obstructions)
+        write_varint(buf, len(self._requirements))
+        for reqlist in self._requirements:
+            write_gp_list(reqlist)
+        write_varint(buf, len(self._assumptions))
+        for assumption in self._assumptions:
+            buf.append(self._assumption_type(assumption))
+            write_gp_list(assumption.gps)
+        return bytes(buf)
+
+    @staticmethod
+    def _assumption_type(assumption: TrackingAssumption) -> int:
+        if isinstance(assumption, SkewComponentAssumption):
+            return 2
+        if isinstance(assumption, SumComponentAssumption):
+            return 1
+        if isinstance(assumption, TrackingAssumption):
+            return 0
+        raise ValueError("Not a valid assumption.")
+
+    @staticmethod
+    def _assumption_from_type(
+        assumption_type: int, gps: Iterable[GriddedPerm]
+    ) -> TrackingAssumption:
+        if assumption_type == 0:
+            # tracking
+            return TrackingAssumption(gps)
+        if assumption_type == 1:
+            # sum
+            return SumComponentAssumption(gps)
+        if assumption_type == 2:
+            # skew
+            return SkewComponentAssumption(gps)
+        raise ValueError("Invalid assumption type.")
+
+    def _to_bytes_v1(self) -> bytes:
+        """Compresses the tiling in version 1 of the bytes format."""
 
         def split_16bit(n) -> Tuple[int, int]:
             """Takes a 16 bit integer and splits it into
@@ -377,14 +547,7 @@ class Tiling(CombinatorialClass):
         if self.assumptions:
             result.extend(split_16bit(len(self.assumptions)))
             for assumption in self.assumptions:
-                if isinstance(assumption, SkewComponentAssumption):
-                    result.append(2)
-                elif isinstance(assumption, SumComponentAssumption):
-                    result.append(1)
-                elif isinstance(assumption, TrackingAssumption):
-                    result.append(0)
-                else:
-                    raise ValueError("Not a valid assumption.")
+                result.append(self._assumption_type(assumption))
                 result.extend(split_16bit(len(assumption.gps)))
                 result.extend(
                     chain.from_iterable(
@@ -403,8 +566,59 @@ class Tiling(CombinatorialClass):
         simplify=False,
         sorted_input=True,
     ) -> "Tiling":
-        """Given a compressed tiling in the form of an 1-byte array, decompress
-        it and return a tiling."""
+        """Given a tiling compressed by to_bytes, in either version of the
+        format, decompress it and return a tiling."""
+        if arrbytes[:3] == Tiling._BYTES_V2_HEADER:
+            obstructions, requirements, assumptions = cls._decode_bytes_v2(arrbytes)
+        else:
+            obstructions, requirements, assumptions = cls._decode_bytes_v1(arrbytes)
+        return cls(
+            obstructions=obstructions,
+            requirements=requirements,
+            assumptions=assumptions,
+            remove_empty_rows_and_cols=remove_empty_rows_and_cols,
+            derive_empty=derive_empty,
+            simplify=simplify,
+            sorted_input=sorted_input,
+        )
+
+    @staticmethod
+    def _decode_bytes_v2(
+        arrbytes: bytes,
+    ) -> Tuple[List[GriddedPerm], List[List[GriddedPerm]], List[TrackingAssumption]]:
+        """Return the obstructions, requirements and assumptions of a tiling
+        compressed in version 2 of the bytes format."""
+        view = memoryview(arrbytes)
+        offset = len(Tiling._BYTES_V2_HEADER)
+
+        def read_gp_list() -> List[GriddedPerm]:
+            nonlocal offset
+            ngps, offset = read_varint(view, offset)
+            res = []
+            for _ in range(ngps):
+                gp, offset = GriddedPerm.read_bytes(view, offset)
+                res.append(gp)
+            return res
+
+        obstructions = read_gp_list()
+        nreqs, offset = read_varint(view, offset)
+        requirements = [read_gp_list() for _ in range(nreqs)]
+        nassumptions, offset = read_varint(view, offset)
+        assumptions = []
+        for _ in range(nassumptions):
+            assumption_type = view[offset]
+            offset += 1
+            assumptions.append(
+                Tiling._assumption_from_type(assumption_type, read_gp_list())
+            )
+        return obstructions, requirements, assumptions
+
+    @staticmethod
+    def _decode_bytes_v1(
+        arrbytes: bytes,
+    ) -> Tuple[List[GriddedPerm], List[List[GriddedPerm]], List[TrackingAssumption]]:
+        """Return the obstructions, requirements and assumptions of a tiling
+        compressed in version 1 of the bytes format."""
 
         def merge_8bit(lh, uh):
             """
@@ -447,26 +661,8 @@ class Tiling(CombinatorialClass):
                 assumption_type = arr[offset]
                 offset += 1
                 gps, offset = recreate_gp_list(offset)
-                if assumption_type == 0:
-                    # tracking
-                    assumptions.append(TrackingAssumption(gps))
-                elif assumption_type == 1:
-                    # sum
-                    assumptions.append(SumComponentAssumption(gps))
-                elif assumption_type == 2:
-                    # skew
-                    assumptions.append(SkewComponentAssumption(gps))
-                else:
-                    raise ValueError("Invalid assumption type.")
-        return cls(
-            obstructions=obstructions,
-            requirements=requirements,
-            assumptions=assumptions,
-            remove_empty_rows_and_cols=remove_empty_rows_and_cols,
-            derive_empty=derive_empty,
-            simplify=simplify,
-            sorted_input=sorted_input,
-        )
+                assumptions.append(Tiling._assumption_from_type(assumption_type, gps))
+        return obstructions, requirements, assumptions
 
     @classmethod
     def from_string(cls, string: str) -> "Tiling":
@@ -542,20 +738,38 @@ class Tiling(CombinatorialClass):
             )
         return self.add_single_cell_requirement(Perm((0,)), cell)
 
+    # The add methods assume that the tiling is simplified, so that its
+    # obstructions form an antichain. Only the new gridded perms need to be
+    # minimized against the existing ones.
+
     def add_obstruction(self, patt: Perm, pos: Iterable[Cell]) -> "Tiling":
         """Returns a new tiling with the obstruction of the pattern
         patt with positions pos."""
-        return Tiling(
-            self._obstructions + (GriddedPerm(patt, pos),),
-            self._requirements,
-            self._assumptions,
-        )
+        return self.add_obstructions((GriddedPerm(patt, pos),))
 
     def add_obstructions(self, gps: Iterable[GriddedPerm]) -> "Tiling":
         """Returns a new tiling with the obstructions added."""
-        new_obs = tuple(gps)
+        obstruction_index = self.obstruction_index
+        new_obs = tuple(
+            ob
+            for ob in GriddedPermReduction._minimize(gps)
+            if obstruction_index.avoids(ob)
+        )
+        new_obs_index = ObstructionIndex(new_obs)
+        obstructions = tuple(
+            sorted(
+                chain(
+                    (ob for ob in self._obstructions if new_obs_index.avoids(ob)),
+                    new_obs,
+                )
+            )
+        )
         return Tiling(
-            self._obstructions + new_obs, self._requirements, self._assumptions
+            obstructions,
+            self._requirements,
+            self._assumptions,
+            sorted_input=True,
+            already_minimized_obs=True,
         )
 
     def add_list_requirement(self, req_list: Iterable[GriddedPerm]) -> "Tiling":
@@ -564,7 +778,11 @@ class Tiling(CombinatorialClass):
         """
         new_req = tuple(req_list)
         return Tiling(
-            self._obstructions, self._requirements + (new_req,), self._assumptions
+            self._obstructions,
+            Tiling.sort_requirements(self._requirements + (new_req,)),
+            self._assumptions,
+            sorted_input=True,
+            already_minimized_obs=True,
         )
 
     def add_requirement(self, patt: Perm, pos: Iterable[Cell]) -> "Tiling":
@@ -590,11 +808,32 @@ class Tiling(CombinatorialClass):
 
     def add_assumptions(self, assumptions: Iterable[TrackingAssumption]) -> "Tiling":
         """Returns a new tiling with the added assumptions."""
-        return Tiling(
+        all_assumptions = tuple(sorted(self._assumptions + tuple(assumptions)))
+        if any(ob.is_empty() for ob in self._obstructions):
+            return Tiling(self._obstructions, self._requirements, all_assumptions)
+        # The obstructions and requirements are unchanged, so only the new
+        # assumptions need to be cleaned, and the cached properties are kept.
+        res: List[TrackingAssumption] = []
+        for assumption in all_assumptions:
+            if assumption not in self._assumptions:
+                assumption = assumption.avoiding(
+                    self.obstruction_index, self.active_cells
+                )
+            if assumption.gps:
+                res.append(assumption)
+        tiling = Tiling(
             self._obstructions,
             self._requirements,
-            self._assumptions + tuple(assumptions),
+            tuple(sorted(set(res))),
+            remove_empty_rows_and_cols=False,
+            derive_empty=False,
+            simplify=False,
+            sorted_input=True,
         )
+        tiling._cached_properties.update(self._cached_properties)
+        tiling._cached_properties.pop("forward_map", None)
+        tiling._cached_properties.pop("backward_map", None)
+        return tiling
 
     def remove_assumption(self, assumption: TrackingAssumption):
         """Returns a new tiling with assumption removed."""
@@ -632,50 +871,92 @@ class Tiling(CombinatorialClass):
             seen_row.append(j)
         return True
 
+    def _prepare_row_col_index(self) -> None:
+        """
+        Compute the active cells in each row and column, and the number of
+        positive cells in each row and column, and store them.
+        """
+        cells_in_row: Dict[int, Set[Cell]] = defaultdict(set)
+        cells_in_col: Dict[int, Set[Cell]] = defaultdict(set)
+        for cell in self.active_cells:
+            cells_in_col[cell[0]].add(cell)
+            cells_in_row[cell[1]].add(cell)
+        self._cached_properties["cells_in_row"] = {
+            row: frozenset(cells) for row, cells in cells_in_row.items()
+        }
+        self._cached_properties["cells_in_col"] = {
+            col: frozenset(cells) for col, cells in cells_in_col.items()
+        }
+        self._cached_properties["positive_in_row"] = Counter(
+            y for _, y in self.positive_cells
+        )
+        self._cached_properties["positive_in_col"] = Counter(
+            x for x, _ in self.positive_cells
+        )
+
+    def _positive_in_row(self, row: int) -> int:
+        """Return the number of positive cells in row."""
+        try:
+            return self._cached_properties["positive_in_row"][row]
+        except KeyError:
+            self._prepare_row_col_index()
+            return self._cached_properties["positive_in_row"][row]
+
+    def _positive_in_col(self, col: int) -> int:
+        """Return the number of positive cells in column."""
+        try:
+            return self._cached_properties["positive_in_col"][col]
+        except KeyError:
+            self._prepare_row_col_index()
+            return self._cached_properties["positive_in_col"][col]
+
     def only_positive_in_row_and_col(self, cell: Cell) -> bool:
         """Check if the cell is the only positive cell in row and column."""
         if cell not in self.positive_cells:
             return False
-        return (
-            sum(1 for (x, y) in self.positive_cells if y == cell[1] or x == cell[0])
-            == 1
-        )
+        return self._positive_in_row(cell[1]) + self._positive_in_col(cell[0]) == 2
 
     def only_positive_in_row(self, cell: Cell) -> bool:
         """Check if the cell is the only positive cell in row."""
         if cell not in self.positive_cells:
             return False
-        inrow = sum(1 for (x, y) in self.positive_cells if y == cell[1])
-        return inrow == 1
+        return self._positive_in_row(cell[1]) == 1
 
     def only_positive_in_col(self, cell: Cell) -> bool:
         """Check if the cell is the only positive cell in column."""
         if cell not in self.positive_cells:
             return False
-        incol = sum(1 for (x, y) in self.positive_cells if x == cell[0])
-        return incol == 1
+        return self._positive_in_col(cell[0]) == 1
 
     def only_cell_in_col(self, cell: Cell) -> bool:
         """Checks if the cell is the only active cell in the column."""
-        return sum(1 for (x, y) in self.active_cells if x == cell[0]) == 1
+        return len(self.cells_in_col(cell[0])) == 1
 
     def only_cell_in_row(self, cell: Cell) -> bool:
         """Checks if the cell is the only active cell in the row."""
-        return sum(1 for (x, y) in self.active_cells if y == cell[1]) == 1
+        return len(self.cells_in_row(cell[1])) == 1
 
     def only_cell_in_row_and_col(self, cell: Cell) -> bool:
         """Checks if the cell is the only active cell in the row."""
-        return (
-            sum(1 for (x, y) in self.active_cells if y == cell[1] or x == cell[0]) == 1
-        )
+        return len(self.cells_in_row(cell[1]) | self.cells_in_col(cell[0])) == 1
 
     def cells_in_row(self, row: int) -> CellFrozenSet:
         """Return all active cells in row."""
-        return frozenset((x, y) for (x, y) in self.active_cells if y == row)
+        try:
+            cells_in_row = self._cached_properties["cells_in_row"]
+        except KeyError:
+            self._prepare_row_col_index()
+            cells_in_row = self._cached_properties["cells_in_row"]
+        return cells_in_row.get(row, frozenset())
 
     def cells_in_col(self, col: int) -> CellFrozenSet:
         """Return all active cells in column."""
-        return frozenset((x, y) for (x, y) in self.active_cells if x == col)
+        try:
+            cells_in_col = self._cached_properties["cells_in_col"]
+        except KeyError:
+            self._prepare_row_col_index()
+            cells_in_col = self._cached_properties["cells_in_col"]
+        return cells_in_col.get(col, frozenset())
 
     def cell_basis(self) -> Dict[Cell, Tuple[List[Perm], List[Perm]]]:
         """Returns a dictionary from cells to basis.
@@ -797,7 +1078,7 @@ class Tiling(CombinatorialClass):
             )
         )
         if check_avoidance:
-            return mapped_assumption.avoiding(self.obstructions)
+            return mapped_assumption.avoiding(self.obstruction_index)
         return mapped_assumption
 
     @property
@@ -1205,12 +1486,7 @@ class Tiling(CombinatorialClass):
         contradicting requirements and obstructions or no gridded permutation
         can be gridded on the tiling.
         """
-        if any(ob.is_empty() for ob in self.obstructions):
-            return True
-        if len(self.requirements) <= 1:
-            return False
-        MGP = MinimalGriddedPerms(self)
-        return all(False for _ in MGP.minimal_gridded_perms(yield_non_minimal=True))
+        return EmptinessChecker(self).is_empty()
 
     def is_finite(self) -> bool:
         """Returns True if all active cells have finite basis."""
@@ -1227,44 +1503,150 @@ class Tiling(CombinatorialClass):
         )
 
     def objects_of_size(self, n: int, **parameters: int) -> Iterator[GriddedPerm]:
-        for gp in self.gridded_perms_of_length(n):
-            if all(
-                self.get_assumption(k).get_value(gp) == val
-                for k, val in parameters.items()
-            ):
-                yield gp
+        for gp, _ in self.gridded_perms_with_parameters(n, **parameters):
+            yield gp
+
+    def gridded_perms_with_parameters(
+        self, n: int, **parameters: int
+    ) -> Iterator[Tuple[GriddedPerm, Tuple[int, ...]]]:
+        """
+        Yield the gridded permutations of length n griddable on the tiling
+        with the given parameters, together with the values of all the
+        parameters in the order of extra_parameters.
+
+        The values are updated as the points are inserted, and branches that
+        can no longer reach the given values are pruned.
+        """
+        values = {self.get_assumption(k): val for k, val in parameters.items()}
+        yield from GriddedPermsOnTiling(self, maxlen=n).gridded_perms_with_values(
+            values
+        )
+
+    def count_by_parameters(self, n: int) -> Dict[Tuple[int, ...], int]:
+        """
+        Return the number of gridded permutations of length n griddable on the
+        tiling with each tuple of values of the parameters, in the order of
+        extra_parameters.
+        """
+        return GriddedPermsOnTiling(self, maxlen=n).count_by_values()
+
+    def initial_conditions(self, check: int = 6) -> List[sympy.Expr]:
+        """
+        Returns a list with the initial conditions to size `check` of the
+        tiling, counting the gridded perms of each size only once.
+        """
+        variables = [sympy.var(k) for k in self.extra_parameters]
+        return [
+            sum(
+                (
+                    count * reduce(mul, map(pow, variables, values), sympy.Number(1))
+                    for values, count in self.count_by_parameters(n).items()
+                ),
+                sympy.Number(0),
+            )
+            for n in range(check + 1)
+        ]
 
     def gridded_perms_of_length(self, length: int) -> Iterator[GriddedPerm]:
         for gp in self.gridded_perms(maxlen=length):
             if len(gp) == length:
                 yield gp
 
-    def gridded_perms(self, maxlen: Optional[int] = None) -> Iterator[GriddedPerm]:
+    def gridded_perms(
+        self, maxlen: Optional[int] = None, processes: Optional[int] = None
+    ) -> Iterator[GriddedPerm]:
         """
         Iterator of all gridded permutations griddable on the tiling.
 
         The gridded permutations are up to length of the longest minimum
         gridded permutations that is griddable on the tiling.
+
+        If processes is more than 1, the search is split across that many
+        worker processes. The gridded perms are yielded in the same order.
+        """
+        yield from GriddedPermsOnTiling(self, maxlen=maxlen, processes=processes)
+
+    def gridded_perms_by_length(self, maxlen: int) -> Iterator[List[GriddedPerm]]:
+        """
+        Yield the list of gridded permutations griddable on the tiling of each
+        length from 0 to maxlen, building each length from the previous one.
+        """
+        yield from GriddedPermsOnTiling(self, maxlen=maxlen).gridded_perms_by_length()
+
+    def count_gridded_perms(
+        self, maxlen: int, processes: Optional[int] = None
+    ) -> List[int]:
+        """
+        Return the number of gridded permutations griddable on the tiling of
+        each length from 0 to maxlen, without keeping the gridded perms.
+
+        If processes is more than 1, the search is split across that many
+        worker processes.
         """
-        yield from GriddedPermsOnTiling(self, maxlen=maxlen)
+        return GriddedPermsOnTiling(
+            self, maxlen=maxlen, processes=processes
+        ).count_by_length()
 
-    def merge(self) -> "Tiling":
+    def random_gridded_perm(
+        self, n: int, rng: Optional[random.Random] = None
+    ) -> GriddedPerm:
+        """
+        Return a uniformly random gridded permutation of length n griddable on
+        the tiling, using rng or the random module.
+
+        The first sample counts the gridded perms below each state of the
+        search, which costs about as much as count_gridded_perms(n). The counts
+        are kept for the last few tilings and lengths sampled, so later
+        samples are cheap.
+        """
+        return self.random_gridded_perms(n, 1, rng)[0]
+
+    def random_gridded_perms(
+        self, n: int, size: int, rng: Optional[random.Random] = None
+    ) -> List[GriddedPerm]:
+        """
+        Return a list of size independent uniformly random gridded
+        permutations of length n griddable on the tiling.
+        """
+        key = (self, n)
+        sampler = Tiling._samplers.get(key)
+        if sampler is None:
+            sampler = GriddedPermsOnTiling(self, maxlen=n)
+            Tiling._samplers[key] = sampler
+        res = sampler.random_gridded_perms(size, rng)
+        if len(res) < size:
+            raise ValueError(
+                "There are no gridded perms of length {} on the tiling".format(n)
+            )
+        return res
+
+    def merge(self, executor: Optional[Executor] = None) -> "Tiling":
         """Return an equivalent tiling with a single requirement list.
-        # TODO: this doesn't work due to minimization on initialising"""
+        # TODO: this doesn't work due to minimization on initialising
+
+        If an executor is given, the minimal gridded perms are searched for
+        with it, see minimal_gridded_perms."""
         if len(self.requirements) <= 1:
             return self
-        mgps = MinimalGriddedPerms(self)
         requirements = tuple(
-            GriddedPerm(gp.patt, gp.pos) for gp in mgps.minimal_gridded_perms()
+            GriddedPerm(gp.patt, gp.pos) for gp in self.minimal_gridded_perms(executor)
         )
         return self.__class__(self.obstructions, (requirements,), self.assumptions)
 
-    def minimal_gridded_perms(self) -> Iterator[GriddedPerm]:
+    def minimal_gridded_perms(
+        self, executor: Optional[Executor] = None
+    ) -> Iterator[GriddedPerm]:
         """
         An iterator over all minimal gridded permutations.
+
+        If an executor is given, the tuples of one gridded perm from each
+        requirement list are split into shards that are searched with it.
         """
         MGP = MinimalGriddedPerms(self)
-        yield from MGP.minimal_gridded_perms()
+        if executor is not None:
+            yield from MGP.parallel_minimal_gridded_perms(executor)
+        else:
+            yield from MGP.minimal_gridded_perms()
 
     def is_epsilon(self) -> bool:
         """Returns True if the generating function for the tiling is 1."""
@@ -1335,6 +1717,19 @@ class Tiling(CombinatorialClass):
             self._cached_properties["point_cells"] = point_cells
             return point_cells
 
+    @property
+    def obstruction_index(self) -> ObstructionIndex:
+        """
+        The obstructions of the tiling grouped by the number of points in each
+        cell, for testing if gridded perms avoid them.
+        """
+        try:
+            return self._cached_properties["obstruction_index"]
+        except KeyError:
+            obstruction_index = ObstructionIndex(self._obstructions)
+            self._cached_properties["obstruction_index"] = obstruction_index
+            return obstruction_index
+
     @property
     def total_points(self) -> int:
         return len(self.point_cells)
@@ -1520,6 +1915,11 @@ class Tiling(CombinatorialClass):
     # Dunder methods
     # -------------------------------------------------------------
 
+    def __reduce__(self) -> Tuple[Callable[[bytes], "Tiling"], Tuple[bytes]]:
+        # Pickle the compact bytes, which from_bytes turns back into the tiling
+        # without simplifying it again. The cached properties are not sent.
+        return self.__class__.from_bytes, (self.to_bytes(),)
+
     def __hash__(self) -> int:
         return (
             hash(self._requirements)